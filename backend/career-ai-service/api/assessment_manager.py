@@ -2,52 +2,55 @@ import json
 from typing import Dict, List, Union
 import os
 import logging
+import numpy as np
+
+# All traits scored by the assessment, in report order
+TRAITS = [
+    'Analytical Thinking',
+    'Critical Thinking',
+    'Problem-Solving',
+    'Logical Reasoning',
+    'Decision-Making',
+    'Strategic Planning',
+    'Research Skills',
+    'Data Analysis',
+    'Verbal Communication',
+    'Written Communication',
+    'Presentation Skills',
+    'Active Listening',
+    'Negotiation',
+    'Persuasion',
+    'Public Speaking',
+    'Teamwork',
+    'Collaboration',
+    'Empathy',
+    'Conflict Resolution',
+    'Networking',
+    'Relationship Building',
+    'Technical Aptitude',
+    'Coding/Programming',
+    'Mathematical Skills',
+    'Scientific Knowledge',
+    'Digital Literacy',
+    'Creativity',
+    'Innovation',
+    'Design Thinking',
+    'Artistic Skills',
+    'Content Creation',
+    'Leadership',
+    'Time Management',
+    'Project Management',
+    'Organizational Skills',
+    'Entrepreneurial Mindset',
+    'Adaptability',
+    'Work Ethic',
+    'Resilience',
+    'Attention to Detail'
+]
 
 class AssessmentManager:
     def __init__(self):
-        # Initialize all traits with default score 0.0
-        self.trait_scores = {
-            'Analytical Thinking': 0.0,
-            'Critical Thinking': 0.0,
-            'Problem-Solving': 0.0,
-            'Logical Reasoning': 0.0,
-            'Decision-Making': 0.0,
-            'Strategic Planning': 0.0,
-            'Research Skills': 0.0,
-            'Data Analysis': 0.0,
-            'Verbal Communication': 0.0,
-            'Written Communication': 0.0,
-            'Presentation Skills': 0.0,
-            'Active Listening': 0.0,
-            'Negotiation': 0.0,
-            'Persuasion': 0.0,
-            'Public Speaking': 0.0,
-            'Teamwork': 0.0,
-            'Collaboration': 0.0,
-            'Empathy': 0.0,
-            'Conflict Resolution': 0.0,
-            'Networking': 0.0,
-            'Relationship Building': 0.0,
-            'Technical Aptitude': 0.0,
-            'Coding/Programming': 0.0,
-            'Mathematical Skills': 0.0,
-            'Scientific Knowledge': 0.0,
-            'Digital Literacy': 0.0,
-            'Creativity': 0.0,
-            'Innovation': 0.0,
-            'Design Thinking': 0.0,
-            'Artistic Skills': 0.0,
-            'Content Creation': 0.0,
-            'Leadership': 0.0,
-            'Time Management': 0.0,
-            'Project Management': 0.0,
-            'Organizational Skills': 0.0,
-            'Entrepreneurial Mindset': 0.0,
-            'Adaptability': 0.0,
-            'Work Ethic': 0.0,
-            'Resilience': 0.0,
-            'Attention to Detail': 0.0
-        }
+        self.traits = list(TRAITS)
         
         try:
             # Load scoring system
@@ -59,73 +62,132 @@ class AssessmentManager:
                 self.scoring_system = json.load(f)
             
             self._validate_scoring_system()
+            self._compile_scoring_system()
             
         except Exception as e:
             logging.error(f"Failed to initialize AssessmentManager: {str(e)}")
             raise
 
     def _validate_scoring_system(self):
-        """Validate that all traits in scoring system exist in trait_scores."""
+        """Validate that all traits in scoring system are known traits."""
+        known_traits = set(self.traits)
         missing_traits = set()
         
         for question in self.scoring_system.values():
             for trait in question.keys():
-                if trait not in self.trait_scores:
+                if trait not in known_traits:
                     missing_traits.add(trait)
         
         if missing_traits:
             logging.error(f"Found undefined traits in scoring system: {missing_traits}")
             raise ValueError(f"Scoring system contains undefined traits: {missing_traits}")
 
+    def _compile_scoring_system(self):
+        """Compile the scoring system into a dense (question, option) x trait weight matrix."""
+        trait_index = {trait: i for i, trait in enumerate(self.traits)}
+        option_rows = {}
+        entries = []
+        max_possible = np.zeros(len(self.traits))
+
+        for question_id, question in self.scoring_system.items():
+            for trait, options in question.items():
+                for option, weight in options.items():
+                    row = option_rows.setdefault((question_id, option), len(option_rows))
+                    entries.append((row, trait_index[trait], weight))
+                if options:
+                    max_possible[trait_index[trait]] += max(options.values())
+
+        weights = np.zeros((len(option_rows), len(self.traits)))
+        for row, col, weight in entries:
+            weights[row, col] += weight
+
+        # Compiled tables are shared by all request threads, so freeze them
+        weights.setflags(write=False)
+        max_possible.setflags(write=False)
+        self._option_rows = option_rows
+        self._question_rows = {}
+        for (question_id, option), row in option_rows.items():
+            self._question_rows.setdefault(question_id, {})[option] = row
+        self._weights = weights
+        self._max_possible = max_possible
+        self._scorable = max_possible > 0
+
+    def _selected_rows(self, answers) -> List[int]:
+        """Map answers onto weight matrix rows; repeated selections count once per selection.
+
+        Answers that are neither a string nor a list of strings select nothing.
+        """
+        rows = []
+        for question_id, answer in answers.items():
+            options = self._question_rows.get(question_id)
+            if options is None:
+                continue
+            if isinstance(answer, str):
+                row = options.get(answer)
+                if row is not None:
+                    rows.append(row)
+                continue
+            if not isinstance(answer, list):
+                continue
+            for ans in answer:
+                row = options.get(ans) if isinstance(ans, str) else None
+                if row is not None:
+                    rows.append(row)
+        return rows
+
     def calculate_scores(self, answers: Dict[str, Union[str, List[str]]]) -> Dict[str, float]:
         """Calculate trait scores based on questionnaire answers."""
         try:
-            # Reset scores
-            for trait in self.trait_scores:
-                self.trait_scores[trait] = 0.0
-                
-            # Process each answer
-            for question_id, answer in answers.items():
-                if question_id not in self.scoring_system:
-                    continue
-
-                question_data = self.scoring_system[question_id]
-                selected_answers = [answer] if isinstance(answer, str) else answer
-                
-                for trait in question_data:
-                    trait_values = question_data[trait]
-                    for ans in selected_answers:
-                        if ans in trait_values:
-                            self.trait_scores[trait] += trait_values[ans]
-            
-            # Normalize scores
-            return self._normalize_scores()
+            rows = self._selected_rows(answers)
+            raw_scores = self._weights[rows].sum(axis=0) if rows else np.zeros(len(self.traits))
+            return self._normalize_scores(raw_scores)
             
         except Exception as e:
             logging.error(f"Score calculation failed: {str(e)}")
             raise
 
-    def _normalize_scores(self) -> Dict[str, float]:
-        """Normalize trait scores to 0-100 range based on maximum possible scores."""
-        max_possible = {trait: 0.0 for trait in self.trait_scores}
-        
-        # Calculate maximum possible score for each trait
-        for question in self.scoring_system.values():
-            for trait, options in question.items():
-                if options:
-                    max_in_question = max(options.values())
-                    max_possible[trait] += max_in_question
-        
-        # Normalize scores
-        normalized = {}
-        for trait, score in self.trait_scores.items():
-            if max_possible[trait] > 0:
-                normalized[trait] = round((score / max_possible[trait]) * 100, 2)
-            else:
-                normalized[trait] = 0.0
-                
+    def calculate_scores_batch(self, answer_sets: List[Dict[str, Union[str, List[str]]]]) -> List[Dict[str, float]]:
+        """Calculate trait scores for many answer sets in one vectorized pass."""
+        try:
+            if not answer_sets:
+                return []
+
+            # One-hot encode every student's selections into a (students x options) count matrix
+            student_rows, option_rows = [], []
+            for i, answers in enumerate(answer_sets):
+                rows = self._selected_rows(answers)
+                student_rows.extend([i] * len(rows))
+                option_rows.extend(rows)
+            n_options = len(self._option_rows)
+            flat_index = np.asarray(student_rows, dtype=np.int64) * n_options + np.asarray(option_rows, dtype=np.int64)
+            counts = np.bincount(flat_index, minlength=len(answer_sets) * n_options).reshape(len(answer_sets), n_options)
+
+            raw_scores = counts @ self._weights
+            normalized = self._normalize_array(raw_scores)
+
+            # Scores take few distinct values, so round each distinct value once with Python's round
+            unique_values, inverse = np.unique(normalized, return_inverse=True)
+            rounded = np.array([round(value, 2) for value in unique_values.tolist()])
+            return [dict(zip(self.traits, row)) for row in rounded[inverse.reshape(normalized.shape)].tolist()]
+
+        except Exception as e:
+            logging.error(f"Batch score calculation failed: {str(e)}")
+            raise
+
+    def _normalize_array(self, raw_scores: np.ndarray) -> np.ndarray:
+        """Scale raw scores (one row per student) to 0-100 by the maximum possible scores."""
+        normalized = np.zeros(raw_scores.shape)
+        np.divide(raw_scores, self._max_possible, out=normalized, where=self._scorable)
+        normalized *= 100
         return normalized
 
+    def _scores_to_dict(self, values: List[float]) -> Dict[str, float]:
+        return {trait: round(value, 2) for trait, value in zip(self.traits, values)}
+
+    def _normalize_scores(self, raw_scores: np.ndarray) -> Dict[str, float]:
+        """Normalize trait scores to 0-100 range based on maximum possible scores."""
+        return self._scores_to_dict(self._normalize_array(raw_scores).tolist())
+
     def get_career_prediction_prompt(self, trait_scores: Dict[str, float], student_info: Dict) -> str:
         """Generate prompt for career prediction based on trait scores."""
         return f"""Based on the following comprehensive assessment of {student_info.get('name', 'the student')}:
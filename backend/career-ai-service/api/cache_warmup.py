@@ -0,0 +1,175 @@
+"""Pre-generate goal-only report sections for the most frequent career goals.
+
+Warming fills the LLM response cache and the section store, so the next reports for these goals
+mostly hit the cache. Run it by hand after a deploy, cache flush or template change:
+
+    python -m api.cache_warmup --top 50
+
+or let the server run it daily at CACHE_WARMUP_HOUR.
+
+Run by hand, warm-up is a separate process with its own rate limiter, drawing on the same per-key Gemini
+quota as the server without the server's limiter seeing it. The command line therefore caps its whole
+process at CACHE_WARMUP_STANDALONE_REQUESTS_PER_MINUTE, a smaller share than the in-server run takes.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+try:
+    import fcntl
+except ImportError:  # Windows: every worker process runs its own warm-up
+    fcntl = None
+from collections import Counter
+from .response_cache import DATA_DIR
+from .goal_canonicalizer import canonicalize_goal
+from .goal_classifier import GOAL_EXAMPLES_ENABLED, get_example_store
+from .prompt_manager import GOAL_ONLY_TOPICS, generate_topic_reports, is_failed_section
+from .rate_limiter import RATE_LIMIT_BURST, REQUESTS_PER_MINUTE, TokenBucket, rate_limiter
+from .task_store import get_task_store
+
+# Warm-up configuration
+CACHE_WARMUP_TOP_GOALS = int(os.getenv('CACHE_WARMUP_TOP_GOALS', '50'))
+CACHE_WARMUP_HOUR = os.getenv('CACHE_WARMUP_HOUR', '')  # Local hour (0-23) for the daily run; empty disables it
+CACHE_WARMUP_REQUESTS_PER_MINUTE = float(os.getenv('CACHE_WARMUP_REQUESTS_PER_MINUTE', str(REQUESTS_PER_MINUTE / 2)))
+# Standalone runs cannot see live traffic, so they take a smaller, fixed share of the quota
+CACHE_WARMUP_STANDALONE_REQUESTS_PER_MINUTE = float(os.getenv('CACHE_WARMUP_STANDALONE_REQUESTS_PER_MINUTE',
+                                                              str(REQUESTS_PER_MINUTE / 4)))
+CACHE_WARMUP_LOCK_PATH = os.path.join(DATA_DIR, 'cache_warmup.lock')
+IDLE_POLL_INTERVAL = 1.0  # Seconds between checks for spare rate-limit capacity
+
+WARMUP_STUDENT = "Student"  # Goal-only prompts do not mention the student
+WARMUP_CONTEXT = "Cache warm-up"
+
+
+def top_goals(limit, task_store=None):
+    """Most frequent canonical goals of completed reports, most frequent first.
+
+    Goals are counted over the completed tasks in the task store. Tasks expire after TASK_TTL, so when
+    none are left the goals recorded for classifier training are counted instead.
+    """
+    counts = Counter((task_store or get_task_store()).goal_counts())
+    if not counts and GOAL_EXAMPLES_ENABLED:
+        counts.update(get_example_store().goal_counts())
+    return [goal for goal, _ in counts.most_common(limit)]
+
+
+def canonical_goals(goals):
+    """Canonicalize free-text goals the way report requests are, dropping duplicates but keeping order."""
+    return list(dict.fromkeys(canonicalize_goal(goal) for goal in goals if goal.strip()))
+
+
+def wait_for_spare_capacity(tokens):
+    """Block until the shared limiter could serve a whole warm-up batch at once, so live reports go first."""
+    tokens = min(tokens, RATE_LIMIT_BURST)
+    while rate_limiter.available_tokens() < tokens:
+        time.sleep(IDLE_POLL_INTERVAL)
+
+
+def warm_goal(goal, budget=None, topics=GOAL_ONLY_TOPICS):
+    """Generate the goal-only sections of one goal; return (sections generated, sections failed)."""
+    if budget is not None:
+        budget.acquire(len(topics))
+    wait_for_spare_capacity(len(topics))
+    # Sequential calls keep warm-up from claiming many concurrency slots at once
+    sections = generate_topic_reports(WARMUP_CONTEXT, goal, WARMUP_STUDENT, concurrent=False, topics=topics)
+    failed = sum(1 for content in sections.values() if is_failed_section(content))
+    return len(sections) - failed, failed + len(topics) - len(sections)
+
+
+def warm_up(goals, progress=None, requests_per_minute=CACHE_WARMUP_REQUESTS_PER_MINUTE):
+    """Warm each goal in turn; progress(done, total, goal, generated, failed, seconds) is called after each."""
+    budget = TokenBucket(requests_per_minute, len(GOAL_ONLY_TOPICS)) if requests_per_minute > 0 else None
+    totals = {'goals': len(goals), 'generated': 0, 'failed': 0}
+    for done, goal in enumerate(goals, 1):
+        started = time.monotonic()
+        try:
+            generated, failed = warm_goal(goal, budget)
+        except Exception as e:
+            logging.error(f"Cache warm-up failed for {goal}: {str(e)}")
+            generated, failed = 0, len(GOAL_ONLY_TOPICS)
+        totals['generated'] += generated
+        totals['failed'] += failed
+        if progress is not None:
+            progress(done, len(goals), goal, generated, failed, time.monotonic() - started)
+    return totals
+
+
+def log_progress(done, total, goal, generated, failed, seconds):
+    logging.info(f"Cache warm-up {done}/{total}: {goal} ({generated} sections, {failed} failed, {seconds:.1f}s)")
+
+
+def seconds_until_hour(hour, now=None):
+    """Seconds from now until the next time the local clock reaches the given hour."""
+    now = time.localtime(now)
+    wait = ((hour - now.tm_hour) % 24) * 3600 - now.tm_min * 60 - now.tm_sec
+    return wait if wait > 0 else wait + 24 * 3600
+
+
+def _try_lock():
+    """Take the host-wide warm-up lock without waiting; return its file, or None if another process holds it."""
+    os.makedirs(os.path.dirname(CACHE_WARMUP_LOCK_PATH), exist_ok=True)
+    lock_file = open(CACHE_WARMUP_LOCK_PATH, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+    return lock_file
+
+
+def warmup_loop(task_store=None, top=CACHE_WARMUP_TOP_GOALS, hour=None):
+    """Run the warm-up once a day at the configured off-peak hour, in one worker process per host."""
+    hour = int(CACHE_WARMUP_HOUR) if hour is None else hour
+    while True:
+        time.sleep(seconds_until_hour(hour))
+        lock_file = _try_lock()
+        if lock_file is None:
+            logging.info("Cache warm-up already running in another worker process")
+            continue
+        try:
+            goals = top_goals(top, task_store)
+            logging.info(f"Cache warm-up started for {len(goals)} goals")
+            totals = warm_up(goals, log_progress)
+            logging.info(f"Cache warm-up finished: {totals}")
+        except Exception as e:
+            logging.error(f"Cache warm-up failed: {str(e)}", exc_info=True)
+        finally:
+            lock_file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m api.cache_warmup', description="Pre-generate goal-only sections")
+    parser.add_argument('--top', type=int, default=CACHE_WARMUP_TOP_GOALS, help="Number of most frequent goals to warm")
+    parser.add_argument('--goals', nargs='*', default=[], help="Warm these goals instead of the most frequent ones")
+    parser.add_argument('--rpm', type=float, default=CACHE_WARMUP_STANDALONE_REQUESTS_PER_MINUTE,
+                        help="Request budget for this process; it shares the Gemini quota with the running "
+                             "server (0 keeps the server's full limit)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.rpm > 0:
+        # This process's limiter only sees warm-up calls, so cap it at the warm-up budget
+        rate_limiter.set_rate(min(args.rpm, rate_limiter.rate * 60))
+
+    if args.goals:
+        goals = canonical_goals(args.goals)
+    else:
+        goals = top_goals(args.top)
+    if not goals:
+        print("No completed reports to take goals from", file=sys.stderr)
+        return 1
+
+    def progress(done, total, goal, generated, failed, seconds):
+        print(f"[{done}/{total}] {goal}: {generated} sections, {failed} failed ({seconds:.1f}s)", file=sys.stderr)
+
+    started = time.monotonic()
+    totals = warm_up(goals, progress, args.rpm)
+    print(f"Warmed {totals['goals']} goals: {totals['generated']} sections generated, {totals['failed']} failed "
+          f"in {time.monotonic() - started:.0f}s", file=sys.stderr)
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,71 +1,225 @@
 import os
+import time
+import asyncio
 import logging
-import google.generativeai as genai
-from functools import lru_cache
+import threading
+from concurrent.futures import Future
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables before provider configuration is read
 load_dotenv()
 
+from .metrics import GEMINI_ERRORS, GEMINI_RETRIES
+from .providers import API_TIMEOUT, QuotaExhaustedError, build_provider_pool
+from .rate_limiter import REQUESTS_PER_MINUTE, REQUESTS_PER_MINUTE_SET, rate_limiter
+from .resilience import (
+    RATE_LIMITED, RETRYABLE_ERRORS, backoff_delay, circuit_breaker, classify_error,
+    concurrency_limiter, retry_hint
+)
+from .response_cache import get_response_cache, make_cache_key
+from .tracing import span
+
 # API configuration parameters
 MAX_RETRIES = 3
-API_TIMEOUT = 30  # Request timeout in seconds
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s: %(message)s")
 
+# Identical prompts currently being generated, keyed by cache key
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# Keys and models that calls are spread across
+_provider_pool = build_provider_pool()
+MODEL_NAME = _provider_pool.primary_model  # Only its responses are cached; change GEMINI_MODELS if needed
+if not REQUESTS_PER_MINUTE_SET:
+    # Each key has its own quota bucket, so the shared budget grows with the number of keys
+    rate_limiter.set_rate(REQUESTS_PER_MINUTE * _provider_pool.key_count)
+
+def get_provider_pool():
+    return _provider_pool
+
 def setup_gemini_api():
     """Configure Gemini API with validation."""
     try:
-        api_key = os.getenv('GOOGLE_API_KEY')  # Ensure this key exists in your .env file
-        if not api_key:
-            raise ValueError("Missing GOOGLE_API_KEY in environment variables.")
-
-        genai.configure(api_key=api_key)
-        logging.info("Gemini API configured successfully")
-        
-        # List available models
-        available_models = [model.name for model in genai.list_models()]
-        logging.info(f"Available models: {available_models}")
-
-        # Ensure the selected model exists
-        selected_model = "models/gemini-2.0-flash"  # Change this if needed
-        if selected_model not in available_models:
-            raise ValueError(f"Model '{selected_model}' is not available. Check your API key and permissions.")
-        
+        _provider_pool.setup()
     except Exception as e:
         logging.error(f"API configuration failed: {str(e)}")
         raise
 
-@lru_cache(maxsize=512)
-def generate_content(prompt, max_tokens=2048, temperature=0.7):
-    """Generate content using Gemini with error handling."""
-    selected_model = "models/gemini-2.0-flash"  # Change this if needed
+class _OwnerCancelled(Exception):
+    """The call generating a shared prompt was cancelled; its waiters generate the prompt themselves."""
+
+def _claim(cache_key):
+    """Return (future, owner) for a prompt; the owner generates it and resolves the future for everyone else."""
+    with _inflight_lock:
+        future = _inflight.get(cache_key)
+        if future is not None:
+            return future, False
+        future = _inflight[cache_key] = Future()
+        return future, True
+
+def _release(cache_key, future):
+    """Drop the in-flight entry and make sure no waiter stays blocked on it, however the owner ended."""
+    with _inflight_lock:
+        if _inflight.get(cache_key) is future:
+            del _inflight[cache_key]
+    if not future.done():
+        future.set_exception(_OwnerCancelled())
+
+def generate_content(prompt, max_tokens=2048, temperature=0.7, cacheable=None):
+    """Generate content using Gemini with error handling.
+
+    cacheable(text), when given, decides whether a response may be cached; cached responses it rejects are
+    generated again.
+    """
+    with span('llm_call') as attrs:
+        cache = get_response_cache()
+        cache_key = make_cache_key(MODEL_NAME, prompt, max_tokens, temperature)
+        cached = cache.get(cache_key)
+        if cached is not None and (cacheable is None or cacheable(cached)):
+            attrs['cache'] = 'hit'
+            return cached
+
+        # Coalesce concurrent requests for the same prompt into one API call
+        while True:
+            future, owner = _claim(cache_key)
+            if owner:
+                break
+            attrs['cache'] = 'coalesced'
+            try:
+                return future.result()
+            except _OwnerCancelled:
+                continue
+
+        attrs['cache'] = 'miss'
+        try:
+            text, model_name = _generate_uncached(prompt, max_tokens, temperature)
+            # Fallback models answer differently, so their output is never cached as the primary's
+            if model_name == MODEL_NAME and (cacheable is None or cacheable(text)):
+                cache.set(cache_key, text)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            _release(cache_key, future)
+
+def _handle_failure(error, attempt, attrs, sent_at=None):
+    """Record a failed attempt and return its backoff delay; re-raise errors that should not be retried."""
+    if isinstance(error, QuotaExhaustedError):
+        # Nothing was sent, so the breaker, concurrency limit and API error metrics are left alone
+        attrs['error_class'] = 'local_quota'
+        logging.warning(f"Local quota wait (attempt {attempt+1}): {str(error)}")
+        if attempt == MAX_RETRIES - 1:
+            raise error
+        return backoff_delay(attempt, error.retry_after)
+    error_class = classify_error(error)
+    attrs['error_class'] = error_class
+    GEMINI_ERRORS.inc(error_class=error_class)
+    circuit_breaker.record_failure(error_class)
+    if error_class == RATE_LIMITED:
+        concurrency_limiter.on_throttle(sent_at)
+    logging.warning(f"API Error (attempt {attempt+1}, {error_class}): {str(error)}")
+    if error_class not in RETRYABLE_ERRORS or attempt == MAX_RETRIES - 1:
+        raise error
+    GEMINI_RETRIES.inc(error_class=error_class)
+    return backoff_delay(attempt, retry_hint(error))
+
+def _record_success():
+    circuit_breaker.record_success()
+    concurrency_limiter.on_success()
+
+def _generate_uncached(prompt, max_tokens, temperature):
+    """Call Gemini with classified retries, backoff and adaptive concurrency, bypassing the cache.
 
+    Returns (text, name of the model that produced it).
+    """
     for attempt in range(MAX_RETRIES):
+        with span('llm_attempt', attempt=attempt + 1) as attrs:
+            probe = circuit_breaker.before_call()
+            try:
+                with concurrency_limiter:
+                    sent_at = None
+                    try:
+                        with span('rate_limit_wait'):
+                            rate_limiter.acquire()
+                        sent_at = time.monotonic()
+                        text, model_name = _provider_pool.generate(prompt, max_tokens, temperature)
+                    except Exception as e:
+                        delay = _handle_failure(e, attempt, attrs, sent_at)
+                    else:
+                        _record_success()
+                        attrs['model'] = model_name
+                        return text, model_name
+            finally:
+                circuit_breaker.release_probe(probe)
+        # Back off without holding a concurrency slot
+        with span('backoff', seconds=round(delay, 3)):
+            time.sleep(delay)
+    return None, None
+
+async def generate_content_async(prompt, max_tokens=2048, temperature=0.7, cacheable=None):
+    """Asyncio version of generate_content; shares the cache and in-flight calls with the threaded path."""
+    with span('llm_call') as attrs:
+        cache = get_response_cache()
+        cache_key = make_cache_key(MODEL_NAME, prompt, max_tokens, temperature)
+        # Cache backends may touch disk, so keep them off the event loop
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None and (cacheable is None or cacheable(cached)):
+            attrs['cache'] = 'hit'
+            return cached
+
+        while True:
+            future, owner = _claim(cache_key)
+            if owner:
+                break
+            attrs['cache'] = 'coalesced'
+            try:
+                # Shielded, so a cancelled waiter does not cancel the shared future under its owner
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _OwnerCancelled:
+                continue
+
+        attrs['cache'] = 'miss'
         try:
-            model = genai.GenerativeModel(selected_model)
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    'temperature': temperature,
-                    'max_output_tokens': max_tokens,
-                    'top_p': 0.9
-                },
-                request_options={'timeout': API_TIMEOUT}
-            )
-            return response.text if response.text else None
+            text, model_name = await _generate_uncached_async(prompt, max_tokens, temperature)
+            if model_name == MODEL_NAME and (cacheable is None or cacheable(text)):
+                await asyncio.to_thread(cache.set, cache_key, text)
+            future.set_result(text)
+            return text
         except Exception as e:
-            logging.warning(f"API Error (attempt {attempt+1}): {str(e)}")
-            if attempt == MAX_RETRIES - 1:
-                raise
-    return None
-
-# Initialize API
-try:
-    setup_gemini_api()
-except Exception as e:
-    logging.error(f"Failed to initialize Gemini API: {str(e)}")
+            future.set_exception(e)
+            raise
+        finally:
+            _release(cache_key, future)
+
+async def _generate_uncached_async(prompt, max_tokens, temperature):
+    """Asyncio version of _generate_uncached."""
+    for attempt in range(MAX_RETRIES):
+        with span('llm_attempt', attempt=attempt + 1) as attrs:
+            probe = circuit_breaker.before_call()
+            try:
+                async with concurrency_limiter:
+                    sent_at = None
+                    try:
+                        with span('rate_limit_wait'):
+                            await rate_limiter.acquire_async()
+                        sent_at = time.monotonic()
+                        text, model_name = await _provider_pool.agenerate(prompt, max_tokens, temperature)
+                    except Exception as e:
+                        delay = _handle_failure(e, attempt, attrs, sent_at)
+                    else:
+                        _record_success()
+                        attrs['model'] = model_name
+                        return text, model_name
+            finally:
+                # A cancelled probe must not leave the breaker waiting for it forever
+                circuit_breaker.release_probe(probe)
+        with span('backoff', seconds=round(delay, 3)):
+            await asyncio.sleep(delay)
+    return None, None
 
 # import os
 # import logging
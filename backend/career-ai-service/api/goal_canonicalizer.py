@@ -0,0 +1,153 @@
+import os
+import re
+import logging
+import threading
+from collections import defaultdict
+from .response_cache import DATA_DIR
+from .sqlite_util import ThreadLocalConnection
+
+# Canonicalization configuration
+GOAL_INDEX_PATH = os.getenv('GOAL_INDEX_PATH', os.path.join(DATA_DIR, 'goal_index.sqlite3'))
+GOAL_SIMILARITY_THRESHOLD = float(os.getenv('GOAL_SIMILARITY_THRESHOLD', '0.8'))
+
+DEFAULT_GOAL = "Career Exploration"
+
+
+def clean_goal(goal):
+    """Strip markdown, quotes and trailing punctuation from an LLM goal answer."""
+    text = str(goal or '').strip()
+    goal = text.splitlines()[0] if text else ''
+    goal = re.sub(r'[*_`"]+', '', goal)
+    goal = re.sub(r'^(career goal|primary career goal)\s*:\s*', '', goal, flags=re.IGNORECASE)
+    return re.sub(r'\s+', ' ', goal).strip(' .,:;!-')
+
+
+def normalize_goal(goal):
+    """Lowercase and reduce a goal to alphanumeric words."""
+    goal = clean_goal(goal).lower().replace('&', ' and ')
+    goal = re.sub(r'[^a-z0-9+#]+', ' ', goal)
+    goal = re.sub(r'^(an?|the)\s+', '', goal.strip())
+    return re.sub(r'\s+', ' ', goal).strip()
+
+
+def trigrams(text):
+    """Character trigrams of a normalized goal, padded at word boundaries."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Dice coefficient between two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+class GoalIndex:
+    """Fuzzy trigram index mapping free-text goals onto previously seen canonical goals."""
+
+    def __init__(self, path=GOAL_INDEX_PATH, threshold=GOAL_SIMILARITY_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._aliases = {}  # normalized goal -> canonical normalized goal
+        self._canonical = {}  # canonical normalized -> (display name, trigrams)
+        self._postings = defaultdict(set)  # trigram -> canonical normalized goals
+        self._last_rowid = 0
+        self._conn = ThreadLocalConnection(path)
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS goals (
+                normalized TEXT PRIMARY KEY,
+                canonical TEXT NOT NULL,
+                display TEXT NOT NULL
+            )"""
+        )
+        self._refresh()
+
+    def _refresh(self):
+        """Load goals added by this or other processes since the last refresh."""
+        rows = self._conn().execute(
+            "SELECT rowid, normalized, canonical, display FROM goals WHERE rowid > ? ORDER BY rowid",
+            (self._last_rowid,)
+        ).fetchall()
+        for rowid, normalized, canonical, display in rows:
+            if normalized == canonical:
+                self._add_canonical(normalized, display)
+            self._aliases[normalized] = canonical
+            self._last_rowid = rowid
+
+    def _add_canonical(self, normalized, display):
+        grams = trigrams(normalized)
+        self._canonical[normalized] = (display, grams)
+        for gram in grams:
+            self._postings[gram].add(normalized)
+
+    def _display(self, normalized):
+        canonical = self._aliases[normalized]
+        return self._canonical.get(canonical, (canonical, None))[0]
+
+    def _best_match(self, normalized):
+        grams = trigrams(normalized)
+        candidates = set()
+        for gram in grams:
+            candidates |= self._postings.get(gram, set())
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = similarity(grams, self._canonical[candidate][1])
+            if score > best_score:
+                best, best_score = candidate, score
+        return (best, best_score) if best_score >= self.threshold else (None, best_score)
+
+    def canonicalize(self, goal):
+        """Return the canonical display name for a goal, registering it if new."""
+        normalized = normalize_goal(goal)
+        if not normalized:
+            return DEFAULT_GOAL
+        with self._lock:
+            if normalized not in self._aliases:
+                self._refresh()
+            if normalized in self._aliases:
+                return self._display(normalized)
+
+            match, score = self._best_match(normalized)
+            if match:
+                canonical, display = match, self._canonical[match][0]
+                logging.info(f"Mapped career goal '{goal}' to '{display}' (similarity {score:.2f})")
+            else:
+                canonical, display = normalized, clean_goal(goal)
+            self._conn().execute(
+                "INSERT OR IGNORE INTO goals (normalized, canonical, display) VALUES (?, ?, ?)",
+                (normalized, canonical, display)
+            )
+            # Another process may have registered the goal first
+            self._refresh()
+            return self._display(normalized)
+
+    def canonical_goals(self):
+        """Return every canonical display name known to the index."""
+        with self._lock:
+            self._refresh()
+            return [display for display, _ in self._canonical.values()]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_goal_index():
+    """Return the process-wide goal index."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = GoalIndex()
+    return _index
+
+
+def canonicalize_goal(goal):
+    """Map a free-text career goal onto its canonical form."""
+    try:
+        return get_goal_index().canonicalize(goal)
+    except Exception as e:
+        logging.error(f"Career goal canonicalization failed: {str(e)}")
+        return clean_goal(goal) or DEFAULT_GOAL
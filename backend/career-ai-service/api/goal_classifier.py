@@ -0,0 +1,331 @@
+"""Local career-goal classifier used before falling back to the LLM.
+
+Each canonical goal is represented by the TF-IDF centroid of the answer text and the mean trait-score
+profile of earlier accepted reports. A prediction is used only when its margin over the runner-up clears
+a threshold tuned offline for precision. Train from the recorded examples with:
+
+    python -m api.goal_classifier --output data/goal_classifier.json
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+from .assessment_manager import TRAITS
+from .response_cache import DATA_DIR
+from .sqlite_util import ThreadLocalConnection
+
+# Classifier configuration
+GOAL_CLASSIFIER_ENABLED = os.getenv('GOAL_CLASSIFIER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+GOAL_CLASSIFIER_PATH = os.getenv('GOAL_CLASSIFIER_PATH', os.path.join(DATA_DIR, 'goal_classifier.json'))
+GOAL_CLASSIFIER_THRESHOLD = os.getenv('GOAL_CLASSIFIER_THRESHOLD')  # Overrides the tuned threshold when set
+GOAL_EXAMPLES_PATH = os.getenv('GOAL_EXAMPLES_PATH', os.path.join(DATA_DIR, 'goal_examples.sqlite3'))
+GOAL_EXAMPLES_ENABLED = os.getenv('GOAL_EXAMPLES_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+TEXT_WEIGHT = 0.7  # Share of the score from answer text; the rest comes from the trait profile
+MIN_EXAMPLES_PER_GOAL = 3
+HOLDOUT_EVERY = 5  # Every n-th example is held out when tuning the threshold
+
+# Where a recorded goal came from; only LLM-picked goals are trained on, so the classifier never learns its own output
+GOAL_SOURCE_LLM = 'llm'
+GOAL_SOURCE_CLASSIFIER = 'classifier'
+GOAL_SOURCE_DEFAULT = 'default'
+TRAINING_SOURCES = (GOAL_SOURCE_LLM,)
+
+TOKEN_PATTERN = re.compile(r'[a-z][a-z+#]{2,}')
+STOPWORDS = frozenset((
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'any', 'can', 'had', 'her', 'was', 'one', 'our',
+    'out', 'has', 'him', 'his', 'how', 'its', 'may', 'who', 'did', 'get', 'let', 'she', 'too', 'use', 'that',
+    'with', 'have', 'this', 'will', 'your', 'from', 'they', 'want', 'been', 'more', 'when', 'what', 'like',
+    'into', 'than', 'them', 'some', 'would', 'there', 'their', 'about', 'which', 'very', 'also', 'enjoy',
+))
+
+
+def tokenize(answers):
+    """Content words from every answer, lowercased."""
+    text = ' '.join(str(answer) for answer in answers if answer).lower()
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+def _tfidf(tokens, idf):
+    """L2-normalized TF-IDF vector as a {term: weight} dict; unseen terms are dropped."""
+    counts = Counter(token for token in tokens if token in idf)
+    vector = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+
+def _trait_vector(trait_scores, mean):
+    """Trait scores centred on the training mean, L2-normalized."""
+    values = np.array([float((trait_scores or {}).get(trait, 0.0)) for trait in TRAITS]) - mean
+    norm = np.linalg.norm(values)
+    return values / norm if norm else values
+
+
+def _normalize_sparse(vector):
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+
+class GoalClassifier:
+    """Nearest-centroid classifier over answer text and trait profiles."""
+
+    def __init__(self, model):
+        self.idf = model['idf']
+        self.trait_mean = np.array(model['trait_mean'])
+        self.threshold = model['threshold']
+        self.text_weight = model.get('text_weight', TEXT_WEIGHT)
+        self.goals = list(model['goals'])
+        self._terms = [model['goals'][goal]['terms'] for goal in self.goals]
+        self._traits = np.array([model['goals'][goal]['traits'] for goal in self.goals])
+
+    @classmethod
+    def train(cls, examples, threshold=0.0, text_weight=TEXT_WEIGHT):
+        """Build a model dict from [(answers, trait_scores, goal)]; goals with too few examples are skipped."""
+        by_goal = defaultdict(list)
+        for answers, trait_scores, goal in examples:
+            by_goal[goal].append((tokenize(answers), trait_scores))
+        by_goal = {goal: rows for goal, rows in by_goal.items() if len(rows) >= MIN_EXAMPLES_PER_GOAL}
+        rows = [row for goal_rows in by_goal.values() for row in goal_rows]
+        if not rows:
+            return None
+
+        document_frequency = Counter(term for tokens, _ in rows for term in set(tokens))
+        idf = {term: math.log((1 + len(rows)) / (1 + count)) + 1 for term, count in document_frequency.items()}
+        trait_mean = np.mean([[float((scores or {}).get(trait, 0.0)) for trait in TRAITS] for _, scores in rows], axis=0)
+
+        goals = {}
+        for goal, goal_rows in sorted(by_goal.items()):
+            centroid = defaultdict(float)
+            for tokens, _ in goal_rows:
+                for term, weight in _tfidf(tokens, idf).items():
+                    centroid[term] += weight
+            traits = np.mean([_trait_vector(scores, trait_mean) for _, scores in goal_rows], axis=0)
+            norm = np.linalg.norm(traits)
+            goals[goal] = {
+                'terms': _normalize_sparse(centroid),
+                'traits': (traits / norm if norm else traits).tolist(),
+                'examples': len(goal_rows),
+            }
+        return {
+            'idf': idf,
+            'trait_mean': trait_mean.tolist(),
+            'text_weight': text_weight,
+            'threshold': threshold,
+            'goals': goals,
+            'examples': len(rows),
+            'trained_at': time.time(),
+        }
+
+    def predict(self, answers, trait_scores=None):
+        """Return (goal, confidence) where confidence is the score margin over the runner-up goal."""
+        if not self.goals:
+            return None, 0.0
+        vector = _tfidf(tokenize(answers), self.idf)
+        text_scores = np.array([sum(weight * terms.get(term, 0.0) for term, weight in vector.items())
+                                for terms in self._terms])
+        scores = self.text_weight * text_scores
+        if trait_scores:
+            scores = scores + (1 - self.text_weight) * (self._traits @ _trait_vector(trait_scores, self.trait_mean))
+        order = np.argsort(scores)[::-1]
+        best = scores[order[0]]
+        runner_up = scores[order[1]] if len(order) > 1 else 0.0
+        return self.goals[order[0]], float(best - runner_up)
+
+    def classify(self, answers, trait_scores=None):
+        """Return the predicted goal when confident enough, otherwise None."""
+        goal, confidence = self.predict(answers, trait_scores)
+        return goal if goal and confidence >= self.threshold else None
+
+
+def tune_threshold(examples, target_precision, text_weight=TEXT_WEIGHT):
+    """Pick the lowest margin threshold whose held-out precision meets the target.
+
+    Returns (threshold, coverage, precision); the threshold is infinite when no margin is precise enough.
+    """
+    held_out = examples[::HOLDOUT_EVERY]
+    training = [example for i, example in enumerate(examples) if i % HOLDOUT_EVERY]
+    model = GoalClassifier.train(training, text_weight=text_weight)
+    if model is None or not held_out:
+        return math.inf, 0.0, None
+
+    classifier = GoalClassifier(model)
+    results = sorted(
+        (classifier.predict(answers, trait_scores)[::-1] + (goal,) for answers, trait_scores, goal in held_out),
+        reverse=True
+    )
+    best = (math.inf, 0.0, None)
+    correct = 0
+    # Walk from the most to the least confident prediction, keeping the widest coverage at target precision
+    for accepted, (confidence, predicted, goal) in enumerate(results, 1):
+        correct += predicted == goal
+        precision = correct / accepted
+        if precision >= target_precision:
+            best = (confidence, accepted / len(results), precision)
+    return best
+
+
+class GoalExampleStore:
+    """Accepted (answers, trait scores, canonical goal) examples for offline training."""
+
+    def __init__(self, path=GOAL_EXAMPLES_PATH):
+        self.path = path
+        self._conn = ThreadLocalConnection(path)
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS goal_examples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                answers TEXT NOT NULL,
+                trait_scores TEXT NOT NULL,
+                goal TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                source TEXT
+            )"""
+        )
+        columns = [row[1] for row in self._conn().execute("PRAGMA table_info(goal_examples)")]
+        if 'source' not in columns:
+            # Examples recorded before sources were tracked have no source and are not trained on
+            self._conn().execute("ALTER TABLE goal_examples ADD COLUMN source TEXT")
+
+    def add(self, answers, trait_scores, goal, source):
+        self._conn().execute(
+            "INSERT INTO goal_examples (answers, trait_scores, goal, created_at, source) VALUES (?, ?, ?, ?, ?)",
+            (json.dumps([str(answer) for answer in answers]), json.dumps(trait_scores or {}), goal, time.time(), source)
+        )
+
+    def goal_counts(self):
+        return dict(self._conn().execute("SELECT goal, COUNT(*) FROM goal_examples GROUP BY goal").fetchall())
+
+    def examples(self, sources=TRAINING_SOURCES):
+        """Training examples whose goal came from one of the given sources."""
+        rows = self._conn().execute(
+            f"SELECT answers, trait_scores, goal FROM goal_examples WHERE source IN ({', '.join('?' * len(sources))}) "
+            "ORDER BY id", tuple(sources)
+        ).fetchall()
+        return [(json.loads(answers), json.loads(trait_scores), goal) for answers, trait_scores, goal in rows]
+
+
+_classifier = None
+_classifier_mtime = None
+_example_store = None
+_lock = threading.Lock()
+
+
+def get_goal_classifier():
+    """Return the classifier loaded from GOAL_CLASSIFIER_PATH, reloading it when the file changes."""
+    global _classifier, _classifier_mtime
+    try:
+        mtime = os.path.getmtime(GOAL_CLASSIFIER_PATH)
+    except OSError:
+        return None
+    if mtime != _classifier_mtime:
+        with _lock:
+            if mtime != _classifier_mtime:
+                try:
+                    with open(GOAL_CLASSIFIER_PATH, 'r') as f:
+                        model = json.load(f)
+                    if GOAL_CLASSIFIER_THRESHOLD is not None:
+                        model['threshold'] = float(GOAL_CLASSIFIER_THRESHOLD)
+                    _classifier = GoalClassifier(model)
+                    logging.info(f"Loaded goal classifier with {len(_classifier.goals)} goals "
+                                 f"(threshold {_classifier.threshold:.3f})")
+                except Exception as e:
+                    logging.error(f"Failed to load goal classifier: {str(e)}")
+                    _classifier = None
+                _classifier_mtime = mtime
+    return _classifier
+
+
+def classify_goal(answers, trait_scores=None):
+    """Return a confidently predicted goal for the answers, or None to fall back to the LLM."""
+    if not GOAL_CLASSIFIER_ENABLED:
+        return None
+    classifier = get_goal_classifier()
+    if classifier is None:
+        return None
+    try:
+        return classifier.classify(answers, trait_scores)
+    except Exception as e:
+        logging.warning(f"Goal classifier failed: {str(e)}")
+        return None
+
+
+def get_example_store():
+    global _example_store
+    if _example_store is None:
+        with _lock:
+            if _example_store is None:
+                _example_store = GoalExampleStore()
+    return _example_store
+
+
+def record_example(answers, trait_scores, goal, source):
+    """Remember the canonical goal of an accepted report; only goals from TRAINING_SOURCES are trained on."""
+    if not GOAL_EXAMPLES_ENABLED:
+        return
+    try:
+        get_example_store().add(answers, trait_scores, goal, source)
+    except Exception as e:
+        logging.warning(f"Failed to record goal example: {str(e)}")
+
+
+def load_pairs(path):
+    """Read extra training pairs from a JSONL file of {"answers": {...}, "goal": ..., "trait_scores": {...}}."""
+    examples = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                pair = json.loads(line)
+                answers = pair['answers']
+                answers = list(answers.values()) if isinstance(answers, dict) else answers
+                examples.append((answers, pair.get('trait_scores'), pair['goal']))
+    return examples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m api.goal_classifier', description="Train the local goal classifier")
+    parser.add_argument('--output', default=GOAL_CLASSIFIER_PATH)
+    parser.add_argument('--pairs', nargs='*', default=[], help="Extra JSONL files of accepted (answers, goal) pairs")
+    parser.add_argument('--no-recorded', action='store_true', help="Ignore examples recorded by the service")
+    parser.add_argument('--target-precision', type=float, default=0.95)
+    parser.add_argument('--text-weight', type=float, default=TEXT_WEIGHT)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    examples = [] if args.no_recorded else get_example_store().examples()
+    for path in args.pairs:
+        examples.extend(load_pairs(path))
+    if not examples:
+        print("No training examples found", file=sys.stderr)
+        return 1
+
+    threshold, coverage, precision = tune_threshold(examples, args.target_precision, args.text_weight)
+    model = GoalClassifier.train(examples, threshold=threshold, text_weight=args.text_weight)
+    if model is None:
+        print(f"No goal has {MIN_EXAMPLES_PER_GOAL} or more examples", file=sys.stderr)
+        return 1
+    if math.isinf(threshold):
+        # JSON has no infinity; a margin above 1 is never reached, so the LLM is always used
+        model['threshold'] = 2.0
+        print(f"No threshold reaches {args.target_precision:.0%} precision; the classifier will defer to the LLM",
+              file=sys.stderr)
+    else:
+        print(f"Threshold {threshold:.3f}: held-out coverage {coverage:.0%} at precision {precision:.0%}", file=sys.stderr)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    temporary = f"{args.output}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(model, f)
+    os.replace(temporary, args.output)
+    print(f"Trained on {model['examples']} examples for {len(model['goals'])} goals; model written to {args.output}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
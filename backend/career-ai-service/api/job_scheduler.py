@@ -0,0 +1,89 @@
+import math
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class QueueFullError(Exception):
+    """Raised when a scheduler's queue has no room for another job."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """Fixed pool of worker threads fed from a bounded FIFO queue."""
+
+    def __init__(self, name, workers, max_queue):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._positions = {}  # job_id -> enqueue sequence number
+        self._next_seq = 0
+        self._head_seq = 0  # Sequence number of the next job to be dequeued
+        self._in_flight = 0
+        self._avg_duration = None  # Moving average of job run time in seconds
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"{name}-worker-{i}", daemon=True).start()
+
+    def submit(self, job_id, fn, *args, **kwargs):
+        """Queue a job and return a Future; raise QueueFullError when the queue is full."""
+        future = Future()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(f"{self.name} queue is full", self.retry_after())
+            seq = self._next_seq
+            self._next_seq += 1
+            self._queue.append((seq, job_id, fn, args, kwargs, future))
+            if job_id is not None:
+                self._positions[job_id] = seq
+            self._cond.notify()
+        return future
+
+    def position(self, job_id):
+        """Return the 1-based queue position of a pending job, or None once it has started."""
+        with self._cond:
+            seq = self._positions.get(job_id)
+            return None if seq is None else seq - self._head_seq + 1
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def in_flight(self):
+        with self._cond:
+            return self._in_flight
+
+    def retry_after(self):
+        """Estimate in seconds how long until a queue slot frees up."""
+        average = self._avg_duration or 30.0
+        return max(1, min(300, math.ceil(average * max(1, len(self._queue)) / self.workers)))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                seq, job_id, fn, args, kwargs, future = self._queue.popleft()
+                self._head_seq = seq + 1
+                if job_id is not None:
+                    self._positions.pop(job_id, None)
+                self._in_flight += 1
+
+            started = time.monotonic()
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                logging.error(f"{self.name} job {job_id} failed: {str(e)}", exc_info=True)
+                future.set_exception(e)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._in_flight -= 1
+                    self._avg_duration = elapsed if self._avg_duration is None else 0.8 * self._avg_duration + 0.2 * elapsed
@@ -1,30 +1,116 @@
 # prompt_manager.py
+import os
+import re
 import time
+import hashlib
+import asyncio
 import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
 from functools import lru_cache
-from .gemini_client import generate_content
-
-RATE_LIMIT_DELAY = 2  # Seconds between API calls
-
-def extract_career_goal(answers):
-    """Extract primary career goal from answers."""
-    if not answers:
-        return "Career Exploration"
-        
+from .gemini_client import generate_content, generate_content_async
+from .goal_classifier import GOAL_SOURCE_CLASSIFIER, GOAL_SOURCE_DEFAULT, GOAL_SOURCE_LLM, classify_goal
+from .metrics import GOAL_EXTRACTIONS, TOPIC_SECONDS
+from .section_store import get_section_store
+from .tracing import span
+
+# Topic fan-out configuration (request pacing is handled by the shared rate limiter)
+CONCURRENT_TOPICS = os.getenv('CONCURRENT_TOPICS', 'true').lower() in ('1', 'true', 'yes')
+MAX_TOPIC_WORKERS = int(os.getenv('MAX_TOPIC_WORKERS', '16'))
+ASYNC_TOPIC_CONCURRENCY = int(os.getenv('ASYNC_TOPIC_CONCURRENCY', '256'))  # Topic calls in flight per event loop
+
+TOPICS = [
+    'personal_traits', 'skills_excel', 'top_careers',
+    'career_intro', 'career_roadmap', 'career_education',
+    'career_growth', 'indian_colleges', 'global_colleges',
+    'industry_analysis', 'financial_planning'
+]
+
+# Batched mode: compatible topics share one request and are split back apart by section markers
+BATCH_TOPICS = os.getenv('BATCH_TOPICS', 'false').lower() in ('1', 'true', 'yes')
+BATCH_MAX_TOKENS = int(os.getenv('BATCH_MAX_TOKENS', '8192'))
+TOPIC_BATCHES = [
+    ('career_education', 'indian_colleges', 'global_colleges'),
+    ('career_intro', 'career_growth', 'industry_analysis'),
+    ('career_roadmap', 'financial_planning', 'skills_excel'),
+]
+SECTION_MARKER = "===SECTION: {topic}==="
+SECTION_MARKER_PATTERN = re.compile(r'^\s*={3,}\s*SECTION:\s*([a-z_]+)\s*={3,}\s*$', re.MULTILINE | re.IGNORECASE)
+MIN_SECTION_LENGTH = 200  # Shorter parsed sections are treated as truncated
+
+# Sections whose prompt depends only on the career goal and can be shared across students
+GOAL_ONLY_TOPICS = [topic for topic in TOPICS if topic != 'personal_traits']
+
+# Section text returned in place of content when generation fails
+FAILED_SECTION_PREFIXES = ("Report generation failed:", "Invalid prompt template")
+PROVISIONAL_PLACEHOLDER = (
+    "This section is still being prepared and will be included in an updated version of this report."
+)
+
+# Status of a stored report section
+SECTION_OK = 'ok'
+SECTION_PROVISIONAL = 'provisional'  # Filled in from an earlier report for the same goal
+SECTION_FAILED = 'failed'
+
+# Bounded pool shared by all reports in this process
+_topic_executor = ThreadPoolExecutor(max_workers=MAX_TOPIC_WORKERS, thread_name_prefix='topic')
+
+# Semaphore shared by all async reports, created on first use inside the event loop
+_topic_semaphore = None
+
+def _career_goal_prompt(answers):
     # Convert answers to string if they're not already
     answers_text = ' '.join(str(answer) for answer in answers if answer)
-    
-    prompt = (
+    return (
         f"Identify primary career goal from these answers: {answers_text}\n"
         "Focus on: direct mentions, implied interests, strongest professional direction.\n"
         "Respond ONLY with the career goal name."
     )
+
+def _classified_goal(answers, trait_scores):
+    """Goal from the local classifier when it is confident, so the LLM call can be skipped."""
+    goal = classify_goal(answers, trait_scores)
+    GOAL_EXTRACTIONS.inc(source=GOAL_SOURCE_CLASSIFIER if goal else GOAL_SOURCE_LLM)
+    return goal
+
+def extract_career_goal_with_source(answers, trait_scores=None):
+    """Return (career goal, source), where source tells the classifier, the LLM and the default apart."""
+    if not answers:
+        return "Career Exploration", GOAL_SOURCE_DEFAULT
+
+    goal = _classified_goal(answers, trait_scores)
+    if goal:
+        return goal, GOAL_SOURCE_CLASSIFIER
+    try:
+        result = generate_content(_career_goal_prompt(answers), max_tokens=300)
+        return (result.strip(), GOAL_SOURCE_LLM) if result else ("Career Exploration", GOAL_SOURCE_DEFAULT)
+    except Exception as e:
+        logging.error(f"Career goal extraction failed: {str(e)}")
+        return "Career Exploration", GOAL_SOURCE_DEFAULT
+
+def extract_career_goal(answers, trait_scores=None):
+    """Extract primary career goal from answers, asking the LLM only when the local classifier is unsure."""
+    return extract_career_goal_with_source(answers, trait_scores)[0]
+
+async def extract_career_goal_with_source_async(answers, trait_scores=None):
+    """Asyncio version of extract_career_goal_with_source."""
+    if not answers:
+        return "Career Exploration", GOAL_SOURCE_DEFAULT
+
+    goal = _classified_goal(answers, trait_scores)
+    if goal:
+        return goal, GOAL_SOURCE_CLASSIFIER
     try:
-        result = generate_content(prompt, max_tokens=300)
-        return result.strip() if result else "Career Exploration"
+        result = await generate_content_async(_career_goal_prompt(answers), max_tokens=300)
+        return (result.strip(), GOAL_SOURCE_LLM) if result else ("Career Exploration", GOAL_SOURCE_DEFAULT)
     except Exception as e:
         logging.error(f"Career goal extraction failed: {str(e)}")
-        return "Career Exploration"
+        return "Career Exploration", GOAL_SOURCE_DEFAULT
+
+async def extract_career_goal_async(answers, trait_scores=None):
+    """Asyncio version of extract_career_goal."""
+    return (await extract_career_goal_with_source_async(answers, trait_scores))[0]
 
 def get_topic_prompt(topic, student_name, career_goal):
     """Return prompt template for given topic."""
@@ -133,45 +219,359 @@ def get_topic_prompt(topic, student_name, career_goal):
      }
     return prompt_templates.get(topic, '')
 
-def generate_topic_reports(context, career_goal, student_name):
-    """Generate reports for all topics."""
+@lru_cache(maxsize=None)
+def prompt_hash(topic):
+    """Short hash of a topic's raw prompt template; it changes whenever the template is edited."""
+    template = get_topic_prompt(topic, '', '')
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:16]
+
+def section_record(career_goal, topic, content, provisional=False):
+    """Build the stored record for a finished report section."""
+    if content == PROVISIONAL_PLACEHOLDER or is_failed_section(content):
+        status = SECTION_FAILED
+    else:
+        status = SECTION_PROVISIONAL if provisional else SECTION_OK
+    return {'goal': career_goal, 'content': content, 'status': status, 'prompt_hash': prompt_hash(topic)}
+
+def stale_sections(stored, career_goal, student_changed=False):
+    """Topics that need regenerating: missing, failed or provisional, written for another goal, or from an
+    outdated prompt template. Student-specific topics are also stale when the student's answers changed."""
+    stale = []
+    for topic in TOPICS:
+        section = stored.get(topic)
+        if (section is None or section['status'] != SECTION_OK or section['goal'] != career_goal
+                or section['prompt_hash'] != prompt_hash(topic)
+                or (student_changed and topic not in GOAL_ONLY_TOPICS)):
+            stale.append(topic)
+    return stale
+
+def _topic_prompt(topic, student_name, career_goal):
+    """Formatted prompt for a topic, or None if the topic has no template."""
+    prompt_template = get_topic_prompt(topic, student_name, career_goal)
+    if not prompt_template:
+        logging.warning(f"No template found for topic: {topic}")
+        return None
+    return prompt_template.format(
+        student_name=student_name,
+        career_goal=career_goal
+    )
+
+def generate_topic_report(topic, career_goal, student_name):
+    """Generate a single topic section; failures are returned as section text."""
+    try:
+        formatted_prompt = _topic_prompt(topic, student_name, career_goal)
+        if not formatted_prompt:
+            return "Invalid prompt template"
+
+        with TOPIC_SECONDS.time(topic=topic), span('topic', topic=topic):
+            content = generate_content(formatted_prompt)
+        if not content:
+            raise ValueError(f"No content generated for {topic}")
+
+        return content
+
+    except Exception as e:
+        logging.error(f"Error generating report for {topic}: {str(e)}")
+        return f"Report generation failed: {str(e)}"
+
+async def generate_topic_report_async(topic, career_goal, student_name):
+    """Asyncio version of generate_topic_report."""
+    try:
+        formatted_prompt = _topic_prompt(topic, student_name, career_goal)
+        if not formatted_prompt:
+            return "Invalid prompt template"
+
+        with TOPIC_SECONDS.time(topic=topic), span('topic', topic=topic):
+            content = await generate_content_async(formatted_prompt)
+        if not content:
+            raise ValueError(f"No content generated for {topic}")
+
+        return content
+
+    except Exception as e:
+        logging.error(f"Error generating report for {topic}: {str(e)}")
+        return f"Report generation failed: {str(e)}"
+
+def get_batch_prompt(topics, student_name, career_goal):
+    """Combine several topic prompts into one request with delimited output."""
+    parts = [
+        f"Write the following {len(topics)} report sections for {career_goal}.\n"
+        "Begin each section with its marker line exactly as shown below, on a line by itself, "
+        "followed by the full section. Do not write anything before the first marker."
+    ]
+    for topic in topics:
+        template = get_topic_prompt(topic, student_name, career_goal)
+        if not template:
+            raise ValueError(f"No template found for topic: {topic}")
+        parts.append(SECTION_MARKER.format(topic=topic) + "\n" + template.format(
+            student_name=student_name,
+            career_goal=career_goal
+        ))
+    return '\n\n'.join(parts)
+
+def split_sections(text, topics):
+    """Split marker-delimited output into {topic: content}, dropping unknown or empty sections."""
+    matches = list(SECTION_MARKER_PATTERN.finditer(text or ''))
+    sections = {}
+    for index, match in enumerate(matches):
+        topic = match.group(1).lower()
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        content = text[match.end():end].strip()
+        if topic in topics and topic not in sections and len(content) >= MIN_SECTION_LENGTH:
+            sections[topic] = content
+    return sections
+
+def _complete_batch(topics):
+    """Cache predicate: a batched response is only cached when every requested section parsed."""
+    return lambda content: len(split_sections(content, topics)) == len(topics)
+
+def _parse_batch(content, topics):
+    sections = split_sections(content, topics)
+    missing = [topic for topic in topics if topic not in sections]
+    if missing:
+        logging.warning(f"Batched response missing sections {missing}; falling back to per-topic calls")
+    return sections
+
+def generate_topic_batch(topics, career_goal, student_name):
+    """Generate several topics in one request; returns only the sections that parsed."""
+    try:
+        prompt = get_batch_prompt(topics, student_name, career_goal)
+        with TOPIC_SECONDS.time(topic='+'.join(topics)), span('topic_batch', topics=list(topics)):
+            content = generate_content(
+                prompt, max_tokens=min(2048 * len(topics), BATCH_MAX_TOKENS), cacheable=_complete_batch(topics)
+            )
+        return _parse_batch(content, topics)
+    except Exception as e:
+        logging.error(f"Error generating batched report for {list(topics)}: {str(e)}")
+        return {}
+
+async def generate_topic_batch_async(topics, career_goal, student_name):
+    """Asyncio version of generate_topic_batch."""
+    try:
+        prompt = get_batch_prompt(topics, student_name, career_goal)
+        with TOPIC_SECONDS.time(topic='+'.join(topics)), span('topic_batch', topics=list(topics)):
+            content = await generate_content_async(
+                prompt, max_tokens=min(2048 * len(topics), BATCH_MAX_TOKENS), cacheable=_complete_batch(topics)
+            )
+        return _parse_batch(content, topics)
+    except Exception as e:
+        logging.error(f"Error generating batched report for {list(topics)}: {str(e)}")
+        return {}
+
+def _run_all(calls, concurrent, deadline=None):
+    """Run (fn, args) calls on the topic pool or inline, returning results in call order.
+
+    Calls not finished by the deadline (a time.monotonic() value) yield None; pooled calls
+    keep running in the background.
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        return [None] * len(calls)
+    if not concurrent:
+        results = []
+        for fn, args in calls:
+            expired = deadline is not None and time.monotonic() >= deadline
+            results.append(None if expired else fn(*args))
+        return results
+    # Each call runs in a copy of the caller's context so it joins the caller's trace
+    futures = [_topic_executor.submit(contextvars.copy_context().run, fn, *args) for fn, args in calls]
+    wait(futures, timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+    return [future.result() if future.done() else None for future in futures]
+
+async def _gather_until(coroutines, deadline=None):
+    """Asyncio version of _run_all: run coroutines concurrently, yielding None for those unfinished at the deadline."""
+    if deadline is not None and time.monotonic() >= deadline:
+        for coroutine in coroutines:
+            coroutine.close()
+        return [None] * len(coroutines)
+    if not coroutines:
+        return []
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    await asyncio.wait(tasks, timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+    return [task.result() if task.done() else None for task in tasks]
+
+def _get_topic_semaphore():
+    global _topic_semaphore
+    if _topic_semaphore is None:
+        _topic_semaphore = asyncio.Semaphore(ASYNC_TOPIC_CONCURRENCY)
+    return _topic_semaphore
+
+def is_failed_section(content):
+    return not content or content.startswith(FAILED_SECTION_PREFIXES)
+
+def _remember_section(career_goal, topic, content):
+    """Keep the latest good goal-only section as a fallback for later reports."""
+    if topic not in GOAL_ONLY_TOPICS or is_failed_section(content):
+        return
+    try:
+        get_section_store().put(career_goal, topic, content)
+    except Exception as e:
+        logging.warning(f"Failed to store section {topic} for {career_goal}: {str(e)}")
+
+def fill_missing_sections(career_goal, reports, topics=None):
+    """Fill missing or failed sections from earlier reports for the same goal.
+
+    Returns (sections, provisional) where provisional lists the topics that were filled in.
+    """
+    sections, provisional = {}, []
+    for topic in topics or TOPICS:
+        content = reports.get(topic)
+        if content is None or is_failed_section(content):
+            provisional.append(topic)
+            cached = None
+            if topic in GOAL_ONLY_TOPICS:
+                try:
+                    cached = get_section_store().get(career_goal, topic)
+                except Exception as e:
+                    logging.warning(f"Failed to read fallback section {topic}: {str(e)}")
+            content = cached or PROVISIONAL_PLACEHOLDER
+        sections[topic] = content
+    return sections, provisional
+
+def _finish_section(on_section, career_goal, topic, content):
+    _remember_section(career_goal, topic, content)
+    _notify(on_section, topic, content)
+
+def _notify(on_section, topic, content):
+    """Pass a finished section to the caller's callback without letting it break the report."""
+    if on_section is None:
+        return
+    try:
+        on_section(topic, content)
+    except Exception as e:
+        logging.error(f"Section callback failed for {topic}: {str(e)}")
+
+def _until_return(on_section):
+    """Return (callback, close): callback forwards to on_section until close() is called.
+
+    Calls cut off by a deadline keep running after the caller has its result; closing the callback keeps
+    their sections out of events the caller publishes afterwards. close() waits for a forward in progress.
+    """
+    if on_section is None:
+        return None, lambda: None
+    lock = threading.Lock()
+    state = {'open': True}
+
+    def callback(topic, content):
+        with lock:
+            if state['open']:
+                on_section(topic, content)
+
+    def close():
+        with lock:
+            state['open'] = False
+
+    return callback, close
+
+def generate_topic_reports(context, career_goal, student_name, concurrent=None, batched=None, on_section=None,
+                           topics=None, deadline=None):
+    """Generate reports for all topics (or the given ones); on_section(topic, content) is called as each one finishes.
+
+    Topics still running at the deadline (a time.monotonic() value) are left out of the result, and on_section
+    is not called for them once this returns; they still reach the section store.
+    """
+    on_section, close = _until_return(on_section)
+    try:
+        return _generate_topic_reports(context, career_goal, student_name, concurrent, batched, on_section, topics,
+                                       deadline)
+    finally:
+        close()
+
+def _generate_topic_reports(context, career_goal, student_name, concurrent, batched, on_section, topics, deadline):
     if not all([context, career_goal, student_name]):
         logging.error("Missing required parameters for report generation")
         return {}
-        
-    topics = [
-        'personal_traits', 'skills_excel', 'top_careers',
-        'career_intro', 'career_roadmap', 'career_education',
-        'career_growth', 'indian_colleges', 'global_colleges',
-        'industry_analysis', 'financial_planning'
-    ]
-    
+
+    if concurrent is None:
+        concurrent = CONCURRENT_TOPICS
+    if batched is None:
+        batched = BATCH_TOPICS
+
+    wanted = [topic for topic in TOPICS if topics is None or topic in topics]
+
+    def single(topic):
+        content = generate_topic_report(topic, career_goal, student_name)
+        _finish_section(on_section, career_goal, topic, content)
+        return content
+
+    def batch(topics):
+        sections = generate_topic_batch(topics, career_goal, student_name)
+        for topic, content in sections.items():
+            _finish_section(on_section, career_goal, topic, content)
+        return sections
+
     reports = {}
-    for topic in topics:
-        try:
-            prompt_template = get_topic_prompt(topic, student_name, career_goal)
-            if not prompt_template:
-                logging.warning(f"No template found for topic: {topic}")
-                reports[topic] = "Invalid prompt template"
-                continue
-            
-            formatted_prompt = prompt_template.format(
-                student_name=student_name,
-                career_goal=career_goal
-            )
-            
-            content = generate_content(formatted_prompt)
-            if not content:
-                raise ValueError(f"No content generated for {topic}")
-                
-            reports[topic] = content
-            time.sleep(RATE_LIMIT_DELAY)
-            
-        except Exception as e:
-            logging.error(f"Error generating report for {topic}: {str(e)}")
-            reports[topic] = f"Report generation failed: {str(e)}"
-            
-    return reports
+    pending = list(wanted)
+    if batched:
+        batches = [batch_topics for batch_topics in TOPIC_BATCHES if all(topic in wanted for topic in batch_topics)]
+        batched_topics = {topic for batch_topics in batches for topic in batch_topics}
+        singles = [topic for topic in wanted if topic not in batched_topics]
+        calls = [(batch, (batch_topics,)) for batch_topics in batches]
+        calls += [(single, (topic,)) for topic in singles]
+        results = _run_all(calls, concurrent, deadline)
+        for sections in results[:len(batches)]:
+            reports.update(sections or {})
+        reports.update((topic, content) for topic, content in zip(singles, results[len(batches):]) if content is not None)
+        # Sections that failed to parse are generated on their own
+        pending = [topic for topic in wanted if topic not in reports]
+
+    results = _run_all([(single, (topic,)) for topic in pending], concurrent, deadline)
+    reports.update((topic, content) for topic, content in zip(pending, results) if content is not None)
+    # Collect in topic order so the report layout stays stable
+    return {topic: reports[topic] for topic in wanted if topic in reports}
+
+async def generate_topic_reports_async(context, career_goal, student_name, batched=None, on_section=None,
+                                       topics=None, deadline=None):
+    """Asyncio version of generate_topic_reports; topic calls share one semaphore instead of a thread pool."""
+    on_section, close = _until_return(on_section)
+    try:
+        return await _generate_topic_reports_async(context, career_goal, student_name, batched, on_section, topics,
+                                                   deadline)
+    finally:
+        # Callbacks run in threads, so wait for one in progress off the event loop
+        await asyncio.to_thread(close)
+
+async def _generate_topic_reports_async(context, career_goal, student_name, batched, on_section, topics, deadline):
+    if not all([context, career_goal, student_name]):
+        logging.error("Missing required parameters for report generation")
+        return {}
+
+    if batched is None:
+        batched = BATCH_TOPICS
+
+    wanted = [topic for topic in TOPICS if topics is None or topic in topics]
+    semaphore = _get_topic_semaphore()
+
+    async def single(topic):
+        async with semaphore:
+            content = await generate_topic_report_async(topic, career_goal, student_name)
+        # Section storage and callbacks may block on disk, so run them off the event loop
+        await asyncio.to_thread(_finish_section, on_section, career_goal, topic, content)
+        return content
+
+    async def batch(topics):
+        async with semaphore:
+            sections = await generate_topic_batch_async(topics, career_goal, student_name)
+        for topic, content in sections.items():
+            await asyncio.to_thread(_finish_section, on_section, career_goal, topic, content)
+        return sections
+
+    reports = {}
+    pending = list(wanted)
+    if batched:
+        batches = [batch_topics for batch_topics in TOPIC_BATCHES if all(topic in wanted for topic in batch_topics)]
+        batched_topics = {topic for batch_topics in batches for topic in batch_topics}
+        singles = [topic for topic in wanted if topic not in batched_topics]
+        results = await _gather_until(
+            [batch(batch_topics) for batch_topics in batches] + [single(topic) for topic in singles], deadline
+        )
+        for sections in results[:len(batches)]:
+            reports.update(sections or {})
+        reports.update((topic, content) for topic, content in zip(singles, results[len(batches):]) if content is not None)
+        pending = [topic for topic in wanted if topic not in reports]
+
+    results = await _gather_until([single(topic) for topic in pending], deadline)
+    reports.update((topic, content) for topic, content in zip(pending, results) if content is not None)
+    return {topic: reports[topic] for topic in wanted if topic in reports}
 
 
 
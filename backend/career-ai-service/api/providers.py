@@ -0,0 +1,478 @@
+import os
+import re
+import json
+import asyncio
+import time
+import random
+import hashlib
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+import google.generativeai as genai
+import google.ai.generativelanguage as glm
+from google.api_core import exceptions as api_exceptions
+from .rate_limiter import TokenBucket, REQUESTS_PER_MINUTE, RATE_LIMIT_BURST
+from .resilience import CLIENT_ERROR, RATE_LIMITED, classify_error, retry_hint
+from .response_cache import DATA_DIR
+
+# Provider configuration
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini')  # gemini or local
+PROVIDER_STRATEGY = os.getenv('PROVIDER_STRATEGY', 'least_loaded')  # least_loaded or round_robin
+API_TIMEOUT = 30  # Request timeout in seconds
+
+# Comma-separated keys and models; later models are fallbacks for the first
+GOOGLE_API_KEYS = [key.strip() for key in os.getenv('GOOGLE_API_KEYS', os.getenv('GOOGLE_API_KEY', '')).split(',') if key.strip()]
+GEMINI_MODELS = [model.strip() for model in os.getenv('GEMINI_MODELS', 'models/gemini-2.0-flash,models/gemini-2.0-flash-lite').split(',') if model.strip()]
+
+# Per-key quota and cool-down after a 429
+KEY_REQUESTS_PER_MINUTE = float(os.getenv('KEY_REQUESTS_PER_MINUTE', str(REQUESTS_PER_MINUTE)))
+KEY_COOLDOWN = float(os.getenv('KEY_COOLDOWN', '30'))  # Seconds when no retry hint is given
+KEY_QUOTA_TIMEOUT = float(os.getenv('KEY_QUOTA_TIMEOUT', '5'))  # Seconds to wait for a key's quota before trying the next
+
+# SDK releases whose GenerativeModel keeps its API clients in _client and _async_client
+GENAI_CLIENT_ATTRIBUTE_VERSIONS = ('0.7.', '0.8.')
+
+# Model list validation (skippable, and cached on disk so restarts need no network)
+GEMINI_VALIDATE_MODELS = os.getenv('GEMINI_VALIDATE_MODELS', 'true').lower() in ('1', 'true', 'yes')
+MODEL_LIST_CACHE_PATH = os.getenv('MODEL_LIST_CACHE_PATH', os.path.join(DATA_DIR, 'gemini_models.json'))
+MODEL_LIST_CACHE_TTL = int(os.getenv('MODEL_LIST_CACHE_TTL', str(24 * 3600)))  # Seconds
+MODEL_LIST_TIMEOUT = 10  # Seconds to wait for the model list at start-up
+
+# Local stand-in backend for offline runs and load tests
+LOCAL_PROVIDER_LATENCY = float(os.getenv('LOCAL_PROVIDER_LATENCY', '0.5'))  # Seconds per call
+LOCAL_PROVIDER_ERROR_RATE = float(os.getenv('LOCAL_PROVIDER_ERROR_RATE', '0'))
+LOCAL_PROVIDER_ERROR = os.getenv('LOCAL_PROVIDER_ERROR', 'unavailable')  # unavailable or rate_limited
+LOCAL_PROVIDER_SEED = int(os.getenv('LOCAL_PROVIDER_SEED', '42'))
+
+LOCAL_GOALS = [
+    (('software', 'coding', 'programming', 'computer'), "Software Engineer"),
+    (('data', 'statistics', 'analytics'), "Data Scientist"),
+    (('doctor', 'medicine', 'medical', 'biology'), "Doctor"),
+    (('design', 'art', 'drawing', 'creative'), "Graphic Designer"),
+    (('business', 'startup', 'entrepreneur'), "Entrepreneur"),
+    (('law', 'legal', 'justice'), "Lawyer"),
+    (('teach', 'education', 'school'), "Teacher"),
+]
+LOCAL_SECTION_MARKER = re.compile(r'^(===SECTION: [a-z_]+===)$', re.MULTILINE)
+
+
+class QuotaExhaustedError(Exception):
+    """No key had local quota left in time; nothing was sent, so this says nothing about the API's health."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ModelUnavailableError(ValueError):
+    """The configured model is not offered to this API key."""
+
+
+# Model lists fetched by this process, keyed by API key id; None records a failed fetch
+_model_lists = {}
+_model_lists_lock = threading.Lock()
+
+
+def _load_model_list(key_id):
+    """Return the cached model list for an API key if it is still fresh."""
+    try:
+        with open(MODEL_LIST_CACHE_PATH, 'r') as f:
+            entry = json.load(f).get(key_id)
+        if entry and time.time() - entry['fetched_at'] < MODEL_LIST_CACHE_TTL:
+            return entry['models']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _bind_clients(model, client=None, async_client=None):
+    """Give one GenerativeModel its own API clients.
+
+    The SDK only offers genai.configure(), which sets one key for the whole process, so per-key clients
+    go into private attributes. Those are only touched on the releases checked here.
+    """
+    version = getattr(genai, '__version__', '')
+    if not version.startswith(GENAI_CLIENT_ATTRIBUTE_VERSIONS) or not hasattr(model, '_client'):
+        raise RuntimeError(
+            f"google-generativeai {version or '(unknown version)'} is not supported for per-key clients; "
+            "install a release pinned in requirements.txt"
+        )
+    if client is not None:
+        model._client = client
+    if async_client is not None:
+        model._async_client = async_client
+
+
+def _save_model_list(key_id, models):
+    try:
+        try:
+            with open(MODEL_LIST_CACHE_PATH, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        cached[key_id] = {'fetched_at': time.time(), 'models': models}
+        os.makedirs(os.path.dirname(os.path.abspath(MODEL_LIST_CACHE_PATH)), exist_ok=True)
+        tmp_path = f"{MODEL_LIST_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cached, f)
+        os.replace(tmp_path, MODEL_LIST_CACHE_PATH)
+    except OSError as e:
+        logging.warning(f"Failed to cache Gemini model list: {str(e)}")
+
+
+class Provider:
+    """One (backend, key, model) combination with its own quota and load tracking."""
+
+    def __init__(self, name, model_name, requests_per_minute=KEY_REQUESTS_PER_MINUTE):
+        self.name = name
+        self.model_name = model_name
+        self.quota = TokenBucket(requests_per_minute, RATE_LIMIT_BURST)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self._cooldown_until = 0.0
+        self.unavailable = False  # Set once the model turns out not to exist for this key
+        self._lock = threading.Lock()
+
+    def setup(self):
+        pass
+
+    def available(self):
+        return not self.unavailable and time.monotonic() >= self._cooldown_until
+
+    def load(self):
+        """Lower is better: requests in flight, plus a penalty when the quota is spent."""
+        return self.in_flight + (0 if self.quota.available_tokens() >= 1 else 1000)
+
+    def cool_down(self, seconds=None):
+        with self._lock:
+            self.throttled += 1
+            self._cooldown_until = time.monotonic() + (seconds if seconds is not None else KEY_COOLDOWN)
+
+    def cooldown_remaining(self):
+        return max(0.0, self._cooldown_until - time.monotonic())
+
+    @contextmanager
+    def _track(self):
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _quota_exhausted(self):
+        """Raised when the key's quota does not free up in time, so the pool moves on to the next provider."""
+        wait = 1 / self.quota.rate if self.quota.rate > 0 else KEY_COOLDOWN
+        return QuotaExhaustedError(f"Quota of {self.name} ({self.model_name}) exhausted", wait)
+
+    def generate(self, prompt, max_tokens, temperature):
+        if not self.quota.acquire(timeout=KEY_QUOTA_TIMEOUT):
+            raise self._quota_exhausted()
+        with self._track():
+            return self._generate(prompt, max_tokens, temperature)
+
+    async def agenerate(self, prompt, max_tokens, temperature):
+        if not await self.quota.acquire_async(timeout=KEY_QUOTA_TIMEOUT):
+            raise self._quota_exhausted()
+        with self._track():
+            return await self._agenerate(prompt, max_tokens, temperature)
+
+    def _generate(self, prompt, max_tokens, temperature):
+        raise NotImplementedError
+
+    async def _agenerate(self, prompt, max_tokens, temperature):
+        """Backends without an async client run the blocking call on a worker thread."""
+        return await asyncio.to_thread(self._generate, prompt, max_tokens, temperature)
+
+    def stats(self):
+        return {
+            'provider': self.name,
+            'model': self.model_name,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'throttled': self.throttled,
+            'cooldown_remaining': round(self.cooldown_remaining(), 1)
+        }
+
+
+class GeminiProvider(Provider):
+    """Gemini model behind one API key, configured lazily once per worker process."""
+
+    def __init__(self, api_key, model_name):
+        key_id = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+        super().__init__(f"gemini:{key_id[:8]}", model_name)
+        self.api_key = api_key
+        self.key_id = key_id
+        self._model = None
+        self._pid = None
+        self._validated_pid = None
+        self._async_loop = None
+        self._setup_lock = threading.Lock()
+
+    def setup(self):
+        """Build the model and its API client once per process; no network calls are made here."""
+        if self._model is not None and self._pid == os.getpid():
+            return
+        with self._setup_lock:
+            # Re-create after a fork: gRPC channels cannot be shared with a parent process
+            if self._model is not None and self._pid == os.getpid():
+                return
+            if not self.api_key:
+                raise ValueError("Missing GOOGLE_API_KEY in environment variables.")
+
+            client_options = {'api_key': self.api_key}
+            model = genai.GenerativeModel(self.model_name)
+            _bind_clients(model, client=glm.GenerativeServiceClient(client_options=client_options))
+            self._model = model
+            self._pid = os.getpid()
+            logging.info(f"Gemini provider {self.name} configured for {self.model_name}")
+
+    def _ensure_valid(self):
+        """Check once per process, on first use, that the model exists for this key."""
+        if not GEMINI_VALIDATE_MODELS or self._validated_pid == os.getpid():
+            return
+        with self._setup_lock:
+            if self._validated_pid != os.getpid():
+                available_models = self._model_list()
+                self._validated_pid = os.getpid()
+                if available_models is not None and self.model_name not in available_models:
+                    self.unavailable = True
+                    logging.warning(f"Disabling provider {self.name}: model {self.model_name} is not available")
+        if self.unavailable:
+            raise ModelUnavailableError(
+                f"Model '{self.model_name}' is not available. Check your API key and permissions."
+            )
+
+    def _model_list(self):
+        """Models offered to this key: from this process's memo, the disk cache, or one list_models call.
+
+        Failed fetches are remembered too, so an unreachable API costs one timeout per key and process.
+        """
+        with _model_lists_lock:
+            entry = _model_lists.get(self.key_id)
+            if entry is not None and entry[0] == os.getpid():
+                return entry[1]
+            available_models = _load_model_list(self.key_id)
+            if available_models is None:
+                try:
+                    model_client = glm.ModelServiceClient(client_options={'api_key': self.api_key})
+                    available_models = [
+                        model.name for model in genai.list_models(
+                            client=model_client, request_options={'timeout': MODEL_LIST_TIMEOUT, 'retry': None}
+                        )
+                    ]
+                    _save_model_list(self.key_id, available_models)
+                    logging.info(f"Available models: {available_models}")
+                except Exception as e:
+                    # Bad keys surface on the first real call instead
+                    logging.warning(f"Could not list Gemini models, skipping validation: {str(e)}")
+                    available_models = None
+            _model_lists[self.key_id] = (os.getpid(), available_models)
+            return available_models
+
+    def _generate(self, prompt, max_tokens, temperature):
+        self.setup()
+        self._ensure_valid()
+        response = self._model.generate_content(
+            prompt,
+            generation_config={
+                'temperature': temperature,
+                'max_output_tokens': max_tokens,
+                'top_p': 0.9
+            },
+            # Retries are handled by generate_content so they can be classified and backed off
+            request_options={'timeout': API_TIMEOUT, 'retry': None}
+        )
+        return response.text if response.text else None
+
+    async def _agenerate(self, prompt, max_tokens, temperature):
+        self.setup()
+        # The model list is fetched at most once per key and process, so a thread keeps it off the loop
+        await asyncio.to_thread(self._ensure_valid)
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            # gRPC asyncio channels belong to the event loop that created them
+            async_client = glm.GenerativeServiceAsyncClient(client_options={'api_key': self.api_key})
+            _bind_clients(self._model, async_client=async_client)
+            self._async_loop = loop
+        response = await self._model.generate_content_async(
+            prompt,
+            generation_config={
+                'temperature': temperature,
+                'max_output_tokens': max_tokens,
+                'top_p': 0.9
+            },
+            request_options={'timeout': API_TIMEOUT, 'retry': None}
+        )
+        return response.text if response.text else None
+
+
+class LocalProvider(Provider):
+    """Deterministic stand-in that answers from templates after a configurable delay."""
+
+    def __init__(self, model_name='local', latency=LOCAL_PROVIDER_LATENCY, error_rate=LOCAL_PROVIDER_ERROR_RATE,
+                 seed=LOCAL_PROVIDER_SEED):
+        super().__init__('local', model_name, requests_per_minute=1e9)  # No quota
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def load(self):
+        return self.in_flight
+
+    def _draw_failure(self):
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _generate(self, prompt, max_tokens, temperature):
+        fail = self._draw_failure()
+        time.sleep(self.latency)
+        return self._respond(prompt, max_tokens, fail)
+
+    async def _agenerate(self, prompt, max_tokens, temperature):
+        fail = self._draw_failure()
+        await asyncio.sleep(self.latency)
+        return self._respond(prompt, max_tokens, fail)
+
+    def _respond(self, prompt, max_tokens, fail):
+        if fail:
+            if LOCAL_PROVIDER_ERROR == 'rate_limited':
+                raise api_exceptions.TooManyRequests("Local provider injected 429. Please retry in 1s")
+            raise api_exceptions.ServiceUnavailable("Local provider injected failure")
+
+        if prompt.startswith("Identify primary career goal"):
+            text = prompt.lower()
+            for keywords, goal in LOCAL_GOALS:
+                if any(keyword in text for keyword in keywords):
+                    return goal
+            return "Software Engineer"
+
+        # Batched prompts are answered section by section, keeping their markers
+        parts = LOCAL_SECTION_MARKER.split(prompt)
+        if len(parts) > 1:
+            return '\n\n'.join(
+                f"{marker}\n{self._section(body, max_tokens)}" for marker, body in zip(parts[1::2], parts[2::2])
+            )
+        return self._section(prompt, max_tokens)
+
+    def _section(self, prompt, max_tokens):
+        title = prompt.strip().splitlines()[0].rstrip(':')
+        points = [line.strip(' -') for line in prompt.strip().splitlines()[1:] if line.strip()]
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        paragraphs = [f"{title}. (Local response {digest[:8]})"]
+        for point in points:
+            paragraphs.append(f"{point}: " + ' '.join(
+                f"This part of the plan covers {point.lower()} in practical detail." for _ in range(4)
+            ))
+        return '\n\n'.join(paragraphs)[:max_tokens * 4]
+
+
+class ProviderPool:
+    """Spread calls across keys and fall back to secondary models when the primary is throttled."""
+
+    def __init__(self, tiers, strategy=PROVIDER_STRATEGY):
+        self.tiers = [list(tier) for tier in tiers if tier]  # Tier 0 is the primary model
+        self.strategy = strategy
+        self._round_robin = itertools.count()
+
+    @property
+    def providers(self):
+        return [provider for tier in self.tiers for provider in tier]
+
+    @property
+    def key_count(self):
+        """Distinct API keys behind the primary model."""
+        return len({getattr(provider, 'key_id', provider.name) for provider in self.tiers[0]})
+
+    @property
+    def primary_model(self):
+        return self.tiers[0][0].model_name
+
+    def setup(self):
+        """Set up every provider; fallback providers that fail are dropped with a warning."""
+        primary, *fallbacks = self.tiers
+        for provider in primary:
+            provider.setup()
+        for tier in fallbacks:
+            for provider in list(tier):
+                try:
+                    provider.setup()
+                except Exception as e:
+                    logging.warning(f"Dropping fallback provider {provider.name} ({provider.model_name}): {str(e)}")
+                    tier.remove(provider)
+        self.tiers = [tier for tier in self.tiers if tier]
+
+    def _ordered(self, tier):
+        available = [provider for provider in tier if provider.available()]
+        if self.strategy == 'round_robin':
+            start = next(self._round_robin) % max(1, len(available))
+            return available[start:] + available[:start]
+        return sorted(available, key=lambda provider: provider.load())
+
+    def _try_next_key(self, provider, error):
+        """After a failed call: True to try another key, False to move to the fallback model."""
+        if isinstance(error, (ModelUnavailableError, QuotaExhaustedError)):
+            return True  # Other keys may still offer the model or have quota left
+        error_class = classify_error(error)
+        if error_class == CLIENT_ERROR:
+            raise error
+        if error_class == RATE_LIMITED:
+            provider.cool_down(retry_hint(error))
+            return True  # Another key may still have quota
+        return False  # Model-level failure; try the fallback model
+
+    def _exhausted(self, last_error):
+        if last_error is not None:
+            return last_error
+        if all(provider.unavailable for provider in self.providers):
+            return ModelUnavailableError("None of the configured models is available")
+        # Every provider is cooling down; tell the retry layer how long to wait
+        wait = min(provider.cooldown_remaining() for provider in self.providers)
+        return api_exceptions.TooManyRequests(f"All LLM providers are throttled. Please retry in {wait:.1f}s")
+
+    def generate(self, prompt, max_tokens, temperature):
+        """Return (text, name of the model that produced it)."""
+        last_error = None
+        for tier in self.tiers:
+            for provider in self._ordered(tier):
+                try:
+                    return provider.generate(prompt, max_tokens, temperature), provider.model_name
+                except Exception as e:
+                    last_error = e
+                    if not self._try_next_key(provider, e):
+                        break
+        raise self._exhausted(last_error)
+
+    async def agenerate(self, prompt, max_tokens, temperature):
+        last_error = None
+        for tier in self.tiers:
+            for provider in self._ordered(tier):
+                try:
+                    return await provider.agenerate(prompt, max_tokens, temperature), provider.model_name
+                except Exception as e:
+                    last_error = e
+                    if not self._try_next_key(provider, e):
+                        break
+        raise self._exhausted(last_error)
+
+    def stats(self):
+        return [provider.stats() for provider in self.providers]
+
+
+def build_provider_pool():
+    """Create the provider pool described by LLM_PROVIDER, GOOGLE_API_KEYS and GEMINI_MODELS."""
+    if LLM_PROVIDER.lower() == 'local':
+        return ProviderPool([[LocalProvider()]])
+    keys = GOOGLE_API_KEYS or [None]
+    return ProviderPool([[GeminiProvider(key, model) for key in keys] for model in GEMINI_MODELS])
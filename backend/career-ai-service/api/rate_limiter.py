@@ -0,0 +1,86 @@
+import os
+import asyncio
+import threading
+import time
+
+# Process-wide request budget for Gemini calls; when unset, gemini_client scales it by the number of API keys
+REQUESTS_PER_MINUTE_SET = 'GEMINI_REQUESTS_PER_MINUTE' in os.environ
+REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '60'))
+RATE_LIMIT_BURST = int(os.getenv('GEMINI_RATE_LIMIT_BURST', '11'))  # One full report fan-out
+
+
+class TokenBucket:
+    """Thread-safe token bucket configured in requests per minute."""
+
+    def __init__(self, requests_per_minute, burst=1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, requests_per_minute):
+        with self._lock:
+            self._refill()
+            self.rate = requests_per_minute / 60.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available_tokens(self):
+        """Tokens that could be taken right now without waiting."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available without waiting."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def _take(self, tokens):
+        """Take tokens and return 0, or return the seconds until they would be available."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate if self.rate > 0 else 1.0
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; return False if the timeout expires first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1, timeout=None):
+        """Wait for tokens without blocking the event loop; return False if the timeout expires first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+
+# Shared limiter for every Gemini request made by this process
+rate_limiter = TokenBucket(REQUESTS_PER_MINUTE, RATE_LIMIT_BURST)
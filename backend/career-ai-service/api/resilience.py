@@ -0,0 +1,237 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from google.api_core import exceptions as api_exceptions
+
+# Backoff configuration
+BACKOFF_BASE = float(os.getenv('GEMINI_BACKOFF_BASE', '1.0'))  # Seconds
+BACKOFF_MAX = float(os.getenv('GEMINI_BACKOFF_MAX', '60'))  # Seconds
+
+# Circuit breaker configuration
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('GEMINI_BREAKER_FAILURES', '5'))
+BREAKER_RESET_TIMEOUT = float(os.getenv('GEMINI_BREAKER_RESET', '30'))  # Seconds
+BREAKER_PROBE_TIMEOUT = float(os.getenv('GEMINI_BREAKER_PROBE_TIMEOUT', '120'))  # Seconds; an unanswered probe then fails
+
+# Adaptive concurrency configuration
+MIN_CONCURRENCY = int(os.getenv('GEMINI_MIN_CONCURRENCY', '1'))
+MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '16'))
+
+# Error classes
+RATE_LIMITED = 'rate_limited'
+TIMEOUT = 'timeout'
+UNAVAILABLE = 'unavailable'
+CLIENT_ERROR = 'client_error'
+UNKNOWN = 'unknown'
+
+RETRYABLE_ERRORS = (RATE_LIMITED, TIMEOUT, UNAVAILABLE, UNKNOWN)
+UPSTREAM_FAILURES = (TIMEOUT, UNAVAILABLE)  # Errors that count against upstream health
+
+RETRY_HINT_PATTERNS = [
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE),
+    re.compile(r'retry[- ]after:?\s*(\d+(?:\.\d+)?)', re.IGNORECASE),
+    re.compile(r'retry in\s*(\d+(?:\.\d+)?)\s*s', re.IGNORECASE),
+]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+def classify_error(error):
+    """Map an exception from the Gemini SDK onto an error class."""
+    if isinstance(error, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)):
+        return RATE_LIMITED
+    if isinstance(error, (api_exceptions.DeadlineExceeded, api_exceptions.GatewayTimeout, TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, (api_exceptions.ServiceUnavailable, api_exceptions.InternalServerError,
+                          api_exceptions.BadGateway, ConnectionError)):
+        return UNAVAILABLE
+    if isinstance(error, (api_exceptions.InvalidArgument, api_exceptions.PermissionDenied,
+                          api_exceptions.Unauthenticated, api_exceptions.NotFound, ValueError)):
+        return CLIENT_ERROR
+
+    message = str(error).lower()
+    if '429' in message or 'quota' in message or 'rate limit' in message:
+        return RATE_LIMITED
+    if 'timeout' in message or 'timed out' in message or 'deadline' in message:
+        return TIMEOUT
+    if '503' in message or '500' in message or 'unavailable' in message:
+        return UNAVAILABLE
+    return UNKNOWN
+
+
+def retry_hint(error):
+    """Extract the server's suggested retry delay in seconds, if any."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers and headers.get('Retry-After'):
+        try:
+            return float(headers['Retry-After'])
+        except ValueError:
+            pass
+    message = str(error)
+    for pattern in RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def backoff_delay(attempt, hint=None):
+    """Exponential backoff with full jitter, never shorter than the server's hint."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    if hint is not None:
+        delay = max(delay, min(hint, BACKOFF_MAX) + random.uniform(0, BACKOFF_BASE))
+    return delay
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, probing again after a cool-down."""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT,
+                 probe_timeout=BREAKER_PROBE_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._probe_started = None
+        self._probe_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half_open' if time.monotonic() - self._opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through; return a probe id when the call is the probe.
+
+        Callers pass the id to release_probe once the call ends, however it ends.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return None
+            now = time.monotonic()
+            if self._probing and now - self._probe_started >= self.probe_timeout:
+                # The probe never reported back; count it as failed and start a new cool-down
+                logging.warning("Gemini circuit breaker probe timed out")
+                self._opened_at = now
+                self._probing = False
+            if now - self._opened_at < self.reset_timeout or self._probing:
+                raise CircuitOpenError("Gemini API is unavailable; failing fast")
+            # Let a single probe call through
+            self._probing = True
+            self._probe_started = now
+            self._probe_id += 1
+            return self._probe_id
+
+    def release_probe(self, probe_id):
+        """End a probe that was cancelled or failed without recording a result, so the next call can probe."""
+        if probe_id is None:
+            return
+        with self._lock:
+            if self._probing and probe_id == self._probe_id:
+                self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info("Gemini circuit breaker closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self, error_class):
+        with self._lock:
+            if error_class not in UPSTREAM_FAILURES:
+                # The API answered, so it is reachable even if it refused this request
+                self._failures = 0
+                self._opened_at = None
+                self._probing = False
+                return
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    logging.warning(f"Gemini circuit breaker opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class AIMDLimiter:
+    """Concurrency limit that grows additively on success and halves on throttling."""
+
+    def __init__(self, initial=MAX_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._in_flight = 0
+        self._last_decrease = float('-inf')
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def __enter__(self):
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+        return False
+
+    async def __aenter__(self):
+        delay = 0.005
+        while True:
+            with self._cond:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return self
+            # Threads wait on the condition; coroutines poll so the event loop never blocks
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def on_success(self):
+        with self._cond:
+            previous = int(self._limit)
+            self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+            if int(self._limit) > previous:
+                self._cond.notify()
+
+    def on_throttle(self, sent_at=None):
+        """Halve the limit once per congestion event.
+
+        Calls sent before the last decrease were already in flight when it happened, so like TCP their
+        throttles are ignored; sent_at is the call's time.monotonic() send time.
+        """
+        with self._cond:
+            if sent_at is not None and sent_at <= self._last_decrease:
+                return
+            self._limit = max(self.minimum, self._limit / 2)
+            self._last_decrease = time.monotonic()
+            logging.info(f"Gemini concurrency limit lowered to {int(self._limit)}")
+
+
+# Shared resilience state for every Gemini call made by this process
+circuit_breaker = CircuitBreaker()
+concurrency_limiter = AIMDLimiter()
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from .sqlite_util import ThreadLocalConnection
+
+DATA_DIR = os.getenv('CAREER_AI_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
+
+# Cache configuration
+LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'sqlite')  # sqlite, memory or none
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(DATA_DIR, 'llm_cache.sqlite3'))
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # Seconds
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+EVICTION_CHECK_INTERVAL = 50  # Writes between size checks
+
+
+def make_cache_key(model, prompt, max_tokens, temperature):
+    """Build a stable key from the parameters that determine a response."""
+    raw = json.dumps([model, prompt, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Base class for LLM response caches with hit/miss counters."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key):
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        # Never cache empty or failed responses
+        if not value or not isinstance(value, str):
+            return
+        self._set(key, value)
+
+    def stats(self):
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                'backend': type(self).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value):
+        raise NotImplementedError
+
+
+class NullResponseCache(ResponseCache):
+    """Cache that stores nothing."""
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value):
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with TTL and byte quota."""
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES):
+        super().__init__()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if self.ttl and time.time() - created_at > self.ttl:
+                del self._entries[key]
+                self._size -= len(value)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (value, time.time())
+            self._size += len(value)
+            while self._size > self.max_bytes and self._entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """On-disk cache shared by every worker process on the host."""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._conn = ThreadLocalConnection(path)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+
+    def _get(self, key):
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            now = time.time()
+            if self.ttl and now - created_at > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache read failed: {str(e)}")
+            return None
+
+    def _set(self, key, value):
+        try:
+            now = time.time()
+            self._conn().execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode('utf-8')), now, now)
+            )
+            with self._writes_lock:
+                self._writes += 1
+                check = self._writes % EVICTION_CHECK_INTERVAL == 0
+            if check:
+                self.evict()
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache write failed: {str(e)}")
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the byte quota."""
+        conn = self._conn()
+        if self.ttl:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_free = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            to_free -= size
+            if to_free <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        logging.info(f"LLM cache evicted {len(victims)} entries")
+
+    def stats(self):
+        stats = super().stats()
+        try:
+            entries, size = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            stats.update({'entries': entries, 'bytes': size})
+        except sqlite3.Error:
+            pass
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache selected by LLM_CACHE_BACKEND."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = LLM_CACHE_BACKEND.lower()
+                try:
+                    if backend == 'sqlite':
+                        _cache = SQLiteResponseCache()
+                    elif backend == 'memory':
+                        _cache = MemoryResponseCache()
+                    else:
+                        _cache = NullResponseCache()
+                except Exception as e:
+                    logging.error(f"Failed to open LLM cache, falling back to memory: {str(e)}")
+                    _cache = MemoryResponseCache()
+    return _cache
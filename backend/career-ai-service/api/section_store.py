@@ -0,0 +1,87 @@
+import os
+import time
+import logging
+import threading
+from .response_cache import DATA_DIR
+from .sqlite_util import ThreadLocalConnection
+
+# Section store configuration
+SECTION_STORE_BACKEND = os.getenv('SECTION_STORE_BACKEND', 'sqlite')  # sqlite or memory
+SECTION_STORE_PATH = os.getenv('SECTION_STORE_PATH', os.path.join(DATA_DIR, 'sections.sqlite3'))
+
+
+class SectionStore:
+    """Latest successfully generated content per (canonical goal, topic), used as a fallback."""
+
+    def get(self, goal, topic):
+        raise NotImplementedError
+
+    def put(self, goal, topic, content):
+        raise NotImplementedError
+
+
+class MemorySectionStore(SectionStore):
+    """Single-process section store kept in a dict."""
+
+    def __init__(self):
+        self._sections = {}
+        self._lock = threading.Lock()
+
+    def get(self, goal, topic):
+        with self._lock:
+            return self._sections.get((goal, topic))
+
+    def put(self, goal, topic, content):
+        with self._lock:
+            self._sections[(goal, topic)] = content
+
+
+class SQLiteSectionStore(SectionStore):
+    """Section store shared by every worker process on the host."""
+
+    def __init__(self, path=SECTION_STORE_PATH):
+        self.path = path
+        self._conn = ThreadLocalConnection(path)
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS sections (
+                goal TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                content TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (goal, topic)
+            )"""
+        )
+
+    def get(self, goal, topic):
+        row = self._conn().execute(
+            "SELECT content FROM sections WHERE goal = ? AND topic = ?", (goal, topic)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, goal, topic, content):
+        self._conn().execute(
+            """INSERT INTO sections (goal, topic, content, updated_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT(goal, topic) DO UPDATE SET content = excluded.content, updated_at = excluded.updated_at""",
+            (goal, topic, content, time.time())
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_section_store():
+    """Return the process-wide section store selected by SECTION_STORE_BACKEND."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    if SECTION_STORE_BACKEND.lower() == 'memory':
+                        _store = MemorySectionStore()
+                    else:
+                        _store = SQLiteSectionStore()
+                except Exception as e:
+                    logging.error(f"Failed to open section store, falling back to memory: {str(e)}")
+                    _store = MemorySectionStore()
+    return _store
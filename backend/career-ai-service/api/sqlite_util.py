@@ -0,0 +1,26 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Callable returning this thread's connection to a SQLite database in WAL mode.
+
+    SQLite connections must not be shared between threads, so each thread lazily opens its own;
+    WAL lets those connections and other processes read while one of them writes.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,464 @@
+import os
+import json
+import hashlib
+import time
+import socket
+import logging
+import threading
+from .response_cache import DATA_DIR
+from .sqlite_util import ThreadLocalConnection
+
+# Task store configuration
+TASK_STORE_BACKEND = os.getenv('TASK_STORE_BACKEND', 'sqlite')  # sqlite or memory
+TASK_STORE_PATH = os.getenv('TASK_STORE_PATH', os.path.join(DATA_DIR, 'tasks.sqlite3'))
+TASK_TTL = int(os.getenv('TASK_TTL', str(24 * 3600)))  # Seconds to keep finished tasks
+ORPHAN_POLICY = os.getenv('ORPHAN_POLICY', 'requeue')  # requeue or fail
+SUBMISSION_REUSE_WINDOW = int(os.getenv('SUBMISSION_REUSE_WINDOW', '600'))  # Seconds a completed report answers duplicates
+
+ACTIVE_STATUSES = ('queued', 'processing', 'pending')  # pending: no section made the deadline yet
+FINISHED_STATUSES = ('completed', 'error')
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Payload fields that decide whether two submissions would produce the same report
+SUBMISSION_FIELDS = ('answers', 'studentName', 'age', 'academicInfo', 'interests')
+
+
+def submission_key(data):
+    """Canonical hash of the parts of a submission that shape its report."""
+    fields = {field: data.get(field) for field in SUBMISSION_FIELDS}
+    if isinstance(fields['studentName'], str):
+        fields['studentName'] = fields['studentName'].strip()
+    canonical = json.dumps(fields, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _reusable(status, updated_at, reuse_window):
+    """Whether a task can answer a duplicate submission instead of starting new work."""
+    if status in ACTIVE_STATUSES:
+        return True
+    return status == 'completed' and time.time() - updated_at < reuse_window
+
+
+def _owner_alive(owner):
+    """Check whether the process that owns a task is still running on this host."""
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname():
+        return True  # Cannot check other hosts; assume alive
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class TaskStore:
+    """Interface for storing report task status records."""
+
+    def create(self, task_id, record, payload=None, key=None):
+        raise NotImplementedError
+
+    def create_or_attach(self, task_id, record, payload, key, reuse_window=SUBMISSION_REUSE_WINDOW):
+        """Atomically return (existing_task_id, False) for a live or recently completed duplicate,
+        or create the task and return (task_id, True)."""
+        raise NotImplementedError
+
+    def get(self, task_id):
+        raise NotImplementedError
+
+    def set(self, task_id, record):
+        raise NotImplementedError
+
+    def delete(self, task_id):
+        raise NotImplementedError
+
+    def purge_expired(self):
+        raise NotImplementedError
+
+    def claim_orphans(self):
+        """Take ownership of active tasks whose worker died; return [(task_id, payload)]."""
+        raise NotImplementedError
+
+    def add_event(self, task_id, event, data):
+        """Append a progress event to a task and return its sequence number."""
+        raise NotImplementedError
+
+    def events(self, task_id, after=0):
+        """Return [(seq, event, data)] for events after the given sequence number."""
+        raise NotImplementedError
+
+    def payload(self, task_id):
+        """Return the submission a task was created from, or None."""
+        raise NotImplementedError
+
+    def set_payload(self, task_id, payload, key=None):
+        """Replace a task's submission (and its duplicate-detection key)."""
+        raise NotImplementedError
+
+    def add_section(self, task_id, topic, section):
+        """Store a new version of a report section ({goal, content, status, prompt_hash}); return its version."""
+        raise NotImplementedError
+
+    def sections(self, task_id):
+        """Return {topic: section} with the latest version of each stored section."""
+        raise NotImplementedError
+
+    def goal_counts(self):
+        """Return {career_goal: completed task count} over the tasks still retained."""
+        raise NotImplementedError
+
+    def queue_position(self, task_id):
+        """Return a queued task's 1-based position among all queued tasks by queued_at, or None if not queued.
+
+        Computed from the store, so every worker process gives the same answer for the same task.
+        """
+        raise NotImplementedError
+
+
+class MemoryTaskStore(TaskStore):
+    """Single-process task store kept in a dict."""
+
+    def __init__(self, ttl=TASK_TTL):
+        self.ttl = ttl
+        self._tasks = {}
+        self._submissions = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id, record, payload=None, key=None):
+        with self._lock:
+            self._tasks[task_id] = {'record': dict(record), 'payload': payload, 'updated_at': time.time(), 'events': [], 'sections': {}}
+            if key:
+                self._submissions[key] = task_id
+
+    def create_or_attach(self, task_id, record, payload, key, reuse_window=SUBMISSION_REUSE_WINDOW):
+        with self._lock:
+            existing = self._tasks.get(self._submissions.get(key))
+            if existing and _reusable(existing['record'].get('status'), existing['updated_at'], reuse_window):
+                return self._submissions[key], False
+            self._tasks[task_id] = {'record': dict(record), 'payload': payload, 'updated_at': time.time(), 'events': [], 'sections': {}}
+            self._submissions[key] = task_id
+            return task_id, True
+
+    def get(self, task_id):
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            return dict(entry['record']) if entry else None
+
+    def set(self, task_id, record):
+        with self._lock:
+            entry = self._tasks.setdefault(task_id, {'payload': None, 'events': [], 'sections': {}})
+            entry['record'] = dict(record)
+            entry['updated_at'] = time.time()
+
+    def delete(self, task_id):
+        with self._lock:
+            self._tasks.pop(task_id, None)
+            for key in [key for key, owner in self._submissions.items() if owner == task_id]:
+                del self._submissions[key]
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                task_id for task_id, entry in self._tasks.items()
+                if entry['record'].get('status') in FINISHED_STATUSES and entry['updated_at'] < cutoff
+            ]
+            for task_id in expired:
+                del self._tasks[task_id]
+            self._submissions = {key: task_id for key, task_id in self._submissions.items() if task_id in self._tasks}
+        return len(expired)
+
+    def claim_orphans(self):
+        return []  # Tasks die with the process that owns them
+
+    def add_event(self, task_id, event, data):
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            if entry is None:
+                return None
+            entry['events'].append((len(entry['events']) + 1, event, data))
+            return len(entry['events'])
+
+    def events(self, task_id, after=0):
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            return list(entry['events'][after:]) if entry else []
+
+    def payload(self, task_id):
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            return entry['payload'] if entry else None
+
+    def set_payload(self, task_id, payload, key=None):
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            if entry is None:
+                return
+            entry['payload'] = payload
+            if key:
+                for old_key in [old_key for old_key, owner in self._submissions.items() if owner == task_id]:
+                    del self._submissions[old_key]
+                self._submissions[key] = task_id
+
+    def add_section(self, task_id, topic, section):
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            if entry is None:
+                return None
+            versions = entry['sections'].setdefault(topic, [])
+            versions.append(dict(section, version=len(versions) + 1, created_at=time.time()))
+            return len(versions)
+
+    def sections(self, task_id):
+        with self._lock:
+            entry = self._tasks.get(task_id)
+            if entry is None:
+                return {}
+            return {topic: dict(versions[-1]) for topic, versions in entry['sections'].items()}
+
+    def goal_counts(self):
+        counts = {}
+        with self._lock:
+            for entry in self._tasks.values():
+                record = entry['record']
+                if record.get('status') == 'completed' and record.get('career_goal'):
+                    counts[record['career_goal']] = counts.get(record['career_goal'], 0) + 1
+        return counts
+
+    def queue_position(self, task_id):
+        with self._lock:
+            queued = sorted(
+                (entry['record'].get('queued_at', 0), queued_id) for queued_id, entry in self._tasks.items()
+                if entry['record'].get('status') == 'queued'
+            )
+        positions = {queued_id: position for position, (_, queued_id) in enumerate(queued, 1)}
+        return positions.get(task_id)
+
+
+class SQLiteTaskStore(TaskStore):
+    """Task store shared by every worker process on the host (SQLite in WAL mode)."""
+
+    def __init__(self, path=TASK_STORE_PATH, ttl=TASK_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._conn = ThreadLocalConnection(path)
+        conn = self._conn()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                record TEXT NOT NULL,
+                payload TEXT,
+                owner TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                submission_key TEXT
+            )"""
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        if 'submission_key' not in columns:
+            conn.execute("ALTER TABLE tasks ADD COLUMN submission_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, updated_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_submission ON tasks (submission_key, updated_at)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS task_events (
+                task_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (task_id, seq)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS task_sections (
+                task_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                goal TEXT NOT NULL,
+                content TEXT NOT NULL,
+                status TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (task_id, topic, version)
+            )"""
+        )
+
+    def create(self, task_id, record, payload=None, key=None):
+        now = time.time()
+        self._conn().execute(
+            """INSERT INTO tasks (task_id, status, record, payload, owner, created_at, updated_at, submission_key)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (task_id, record.get('status', 'queued'), json.dumps(record),
+             json.dumps(payload) if payload is not None else None, OWNER, now, now, key)
+        )
+
+    def create_or_attach(self, task_id, record, payload, key, reuse_window=SUBMISSION_REUSE_WINDOW):
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent duplicates across processes serialize here
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT task_id, status, updated_at FROM tasks WHERE submission_key = ? ORDER BY updated_at DESC",
+                (key,)
+            ).fetchall()
+            for existing_id, status, updated_at in rows:
+                if _reusable(status, updated_at, reuse_window):
+                    conn.execute("COMMIT")
+                    return existing_id, False
+            self.create(task_id, record, payload, key)
+            conn.execute("COMMIT")
+            return task_id, True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, task_id):
+        row = self._conn().execute("SELECT record FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, task_id, record):
+        now = time.time()
+        self._conn().execute(
+            """INSERT INTO tasks (task_id, status, record, owner, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(task_id) DO UPDATE SET status = excluded.status, record = excluded.record,
+               owner = excluded.owner, updated_at = excluded.updated_at""",
+            (task_id, record.get('status', 'processing'), json.dumps(record), OWNER, now, now)
+        )
+
+    def delete(self, task_id):
+        conn = self._conn()
+        conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+        conn.execute("DELETE FROM task_events WHERE task_id = ?", (task_id,))
+        conn.execute("DELETE FROM task_sections WHERE task_id = ?", (task_id,))
+
+    def purge_expired(self):
+        conn = self._conn()
+        placeholders = ', '.join('?' for _ in FINISHED_STATUSES)
+        cursor = conn.execute(
+            f"DELETE FROM tasks WHERE status IN ({placeholders}) AND updated_at < ?",
+            (*FINISHED_STATUSES, time.time() - self.ttl)
+        )
+        if cursor.rowcount:
+            conn.execute("DELETE FROM task_events WHERE task_id NOT IN (SELECT task_id FROM tasks)")
+            conn.execute("DELETE FROM task_sections WHERE task_id NOT IN (SELECT task_id FROM tasks)")
+        return cursor.rowcount
+
+    def claim_orphans(self):
+        conn = self._conn()
+        placeholders = ', '.join('?' for _ in ACTIVE_STATUSES)
+        rows = conn.execute(
+            f"SELECT task_id, owner, payload FROM tasks WHERE status IN ({placeholders}) AND owner != ?",
+            (*ACTIVE_STATUSES, OWNER)
+        ).fetchall()
+        claimed = []
+        for task_id, owner, payload in rows:
+            if _owner_alive(owner):
+                continue
+            # Only one surviving worker wins the claim
+            cursor = conn.execute(
+                "UPDATE tasks SET owner = ?, updated_at = ? WHERE task_id = ? AND owner = ?",
+                (OWNER, time.time(), task_id, owner)
+            )
+            if cursor.rowcount:
+                claimed.append((task_id, json.loads(payload) if payload else None))
+        return claimed
+
+    def add_event(self, task_id, event, data):
+        # The sequence number is assigned inside the insert so concurrent writers cannot collide
+        cursor = self._conn().execute(
+            """INSERT INTO task_events (task_id, seq, event, data, created_at)
+               SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM task_events WHERE task_id = ?""",
+            (task_id, event, json.dumps(data), time.time(), task_id)
+        )
+        return self._conn().execute(
+            "SELECT seq FROM task_events WHERE rowid = ?", (cursor.lastrowid,)
+        ).fetchone()[0]
+
+    def events(self, task_id, after=0):
+        rows = self._conn().execute(
+            "SELECT seq, event, data FROM task_events WHERE task_id = ? AND seq > ? ORDER BY seq",
+            (task_id, after)
+        ).fetchall()
+        return [(seq, event, json.loads(data)) for seq, event, data in rows]
+
+    def payload(self, task_id):
+        row = self._conn().execute("SELECT payload FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def set_payload(self, task_id, payload, key=None):
+        self._conn().execute(
+            "UPDATE tasks SET payload = ?, submission_key = COALESCE(?, submission_key) WHERE task_id = ?",
+            (json.dumps(payload), key, task_id)
+        )
+
+    def add_section(self, task_id, topic, section):
+        # Like event sequence numbers, versions are assigned inside the insert
+        cursor = self._conn().execute(
+            """INSERT INTO task_sections (task_id, topic, version, goal, content, status, prompt_hash, created_at)
+               SELECT ?, ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ?, ? FROM task_sections
+               WHERE task_id = ? AND topic = ?""",
+            (task_id, topic, section['goal'], section['content'], section['status'], section['prompt_hash'],
+             time.time(), task_id, topic)
+        )
+        return self._conn().execute(
+            "SELECT version FROM task_sections WHERE rowid = ?", (cursor.lastrowid,)
+        ).fetchone()[0]
+
+    def sections(self, task_id):
+        rows = self._conn().execute(
+            """SELECT topic, version, goal, content, status, prompt_hash, created_at FROM task_sections s
+               WHERE task_id = ? AND version = (
+                   SELECT MAX(version) FROM task_sections WHERE task_id = s.task_id AND topic = s.topic
+               )""",
+            (task_id,)
+        ).fetchall()
+        return {
+            topic: {'version': version, 'goal': goal, 'content': content, 'status': status,
+                    'prompt_hash': prompt_hash, 'created_at': created_at}
+            for topic, version, goal, content, status, prompt_hash, created_at in rows
+        }
+
+    def goal_counts(self):
+        rows = self._conn().execute(
+            """SELECT json_extract(record, '$.career_goal') AS goal, COUNT(*) FROM tasks
+               WHERE status = 'completed' AND goal IS NOT NULL GROUP BY goal"""
+        ).fetchall()
+        return dict(rows)
+
+    def queue_position(self, task_id):
+        row = self._conn().execute(
+            """WITH queued AS (
+                   SELECT task_id, COALESCE(json_extract(record, '$.queued_at'), 0) AS queued_at
+                   FROM tasks WHERE status = 'queued'
+               ), target AS (SELECT queued_at FROM queued WHERE task_id = ?)
+               SELECT COUNT(*) FROM queued, target
+               WHERE queued.queued_at < target.queued_at
+                  OR (queued.queued_at = target.queued_at AND queued.task_id <= ?)""",
+            (task_id, task_id)
+        ).fetchone()
+        return row[0] or None
+
+
+def recover_orphans(store, resubmit):
+    """Requeue or fail tasks left behind by dead workers; resubmit(task_id, payload) requeues one."""
+    for task_id, payload in store.claim_orphans():
+        if ORPHAN_POLICY == 'requeue' and payload is not None:
+            try:
+                store.set(task_id, {'status': 'queued', 'queued_at': time.time()})
+                resubmit(task_id, payload)
+                logging.warning(f"Requeued orphaned task {task_id}")
+                continue
+            except Exception as e:
+                logging.error(f"Failed to requeue orphaned task {task_id}: {str(e)}")
+        store.set(task_id, {'status': 'error', 'error': "Report worker stopped before the task finished"})
+        logging.warning(f"Marked orphaned task {task_id} as failed")
+
+
+def get_task_store():
+    """Create the task store selected by TASK_STORE_BACKEND."""
+    if TASK_STORE_BACKEND.lower() == 'memory':
+        return MemoryTaskStore()
+    return SQLiteTaskStore()
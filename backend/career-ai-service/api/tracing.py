@@ -0,0 +1,104 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Trace and span of the code currently running; copied into topic worker threads
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Trace:
+    """Timeline of named spans for one report task, with times relative to its origin."""
+
+    def __init__(self, name, origin=None):
+        self.name = name
+        self.origin = origin if origin is not None else time.time()
+        # Map perf_counter readings onto the wall-clock origin
+        self._perf_origin = time.perf_counter() - (time.time() - self.origin)
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def offset(self, perf_time=None):
+        return (perf_time if perf_time is not None else time.perf_counter()) - self._perf_origin
+
+    def add(self, name, start, end, attrs=None, parent=None):
+        """Record a finished span; start and end are seconds from the trace origin."""
+        span = {
+            'name': name,
+            'start': round(start, 4),
+            'end': round(end, 4),
+            'duration': round(end - start, 4),
+            'thread': threading.current_thread().name,
+        }
+        if parent:
+            span['parent'] = parent
+        if attrs:
+            span['attrs'] = attrs
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span['start'])
+        return {
+            'name': self.name,
+            'started_at': self.origin,
+            'duration': round(self.offset(), 4),
+            'spans': spans,
+        }
+
+
+@contextmanager
+def start_trace(name, origin=None):
+    """Make a new trace current for the enclosed block and yield it."""
+    trace = Trace(name, origin)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as a span of the current trace; yields a dict for extra attributes."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield attrs
+        return
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    start = trace.offset()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs.setdefault('error', str(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.add(name, start, trace.offset(), attrs, parent)
+
+
+def to_chrome_trace(trace):
+    """Convert a stored trace dict into Chrome trace-event JSON (chrome://tracing, Perfetto)."""
+    threads = {}
+    events = []
+    for item in trace.get('spans', []):
+        tid = threads.setdefault(item['thread'], len(threads) + 1)
+        events.append({
+            'name': item['name'],
+            'cat': item.get('parent') or 'task',
+            'ph': 'X',
+            'ts': round(item['start'] * 1e6),
+            'dur': round(item['duration'] * 1e6),
+            'pid': 1,
+            'tid': tid,
+            'args': item.get('attrs', {}),
+        })
+    for thread, tid in threads.items():
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': thread}})
+    events.append({'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': trace.get('name', 'task')}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
@@ -0,0 +1,356 @@
+# ASGI entry point serving the same API as server.py from an asyncio event loop.
+# Reports wait on Gemini as coroutines instead of holding a worker thread each, so one process can keep
+# thousands of reports in flight. Run with:
+#
+#     hypercorn asgi:app --bind 0.0.0.0:3001
+
+from quart import Quart, request, jsonify, send_file, send_from_directory, Response
+from quart_cors import cors
+from werkzeug.exceptions import NotFound
+import asyncio
+import contextvars
+import functools
+import logging
+import json
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from api.prompt_manager import extract_career_goal_with_source_async, generate_topic_reports_async
+from api.goal_canonicalizer import canonicalize_goal
+from api.goal_classifier import record_example
+from api.job_scheduler import QueueFullError
+from api.metrics import REGISTRY, gauge
+from api.task_store import FINISHED_STATUSES, submission_key
+from api.tracing import start_trace, to_chrome_trace
+from reports.report_builder import report_context, student_details
+# Shares task store, report store, metrics and the render pool with the threaded server
+from server import (
+    REPORT_DEADLINE_SECONDS, REPORTS_DIR, STREAM_HEARTBEAT_INTERVAL, STREAM_POLL_INTERVAL, STREAM_RETRY_MS,
+    TERMINAL_EVENTS, BATCH_CHUNK_SIZE, assessment_manager, fail_task, finish_report, publish_event, report_store,
+    score_batch, stage, start_regeneration, task_store
+)
+
+# Async report configuration
+ASYNC_MAX_REPORTS = int(os.getenv('ASYNC_MAX_REPORTS', '1000'))  # Report pipelines running at once
+ASYNC_REPORT_QUEUE_SIZE = int(os.getenv('ASYNC_REPORT_QUEUE_SIZE', '10000'))  # Reports waiting for a pipeline slot
+ASYNC_BLOCKING_WORKERS = int(os.getenv('ASYNC_BLOCKING_WORKERS', '32'))  # Threads for scoring, storage and PDF hand-off
+
+app = cors(Quart(__name__))
+
+# Blocking work never runs on the event loop; PDF rendering itself still happens in the render processes
+blocking_executor = ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_WORKERS, thread_name_prefix='blocking')
+report_slots = asyncio.Semaphore(ASYNC_MAX_REPORTS)
+report_tasks = set()  # Keeps running report tasks referenced until they finish
+avg_report_seconds = None  # Moving average of report run time
+
+gauge('career_async_reports_in_flight', "Async report pipelines running or waiting for a slot", fn=lambda: len(report_tasks))
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call on the blocking pool, keeping the caller's trace context."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(blocking_executor, functools.partial(context.run, fn, *args, **kwargs))
+
+def retry_after():
+    """Estimate in seconds how long until a report slot frees up."""
+    average = avg_report_seconds or 30.0
+    waiting = max(1, len(report_tasks) - ASYNC_MAX_REPORTS)
+    return max(1, min(300, math.ceil(average * waiting / ASYNC_MAX_REPORTS)))
+
+def queue_full_response(error):
+    """Build a 503 response telling the client when to retry."""
+    response = jsonify({"error": "Server is busy, please retry later", "retry_after": error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def schedule_report(data, task_id):
+    """Start a report as an event loop task; raise QueueFullError when too many are pending."""
+    if len(report_tasks) >= ASYNC_MAX_REPORTS + ASYNC_REPORT_QUEUE_SIZE:
+        raise QueueFullError("async report queue is full", retry_after())
+    task = asyncio.create_task(generate_report(data, task_id))
+    report_tasks.add(task)
+    task.add_done_callback(report_tasks.discard)
+
+@app.route('/api/calculate-scores', methods=['POST'])
+async def calculate_scores():
+    """Calculate trait scores based on questionnaire answers without generating a report."""
+    try:
+        data = await request.get_json()
+        if not data or 'answers' not in data:
+            return jsonify({"error": "Missing answers data"}), 400
+        if not isinstance(data['answers'], dict):
+            return jsonify({"error": "Invalid answers format"}), 400
+
+        trait_scores = await run_blocking(assessment_manager.calculate_scores, data['answers'])
+
+        return jsonify({
+            "message": "Skill scores calculated successfully",
+            "trait_scores": trait_scores
+        }), 200
+
+    except Exception as e:
+        logging.error(f"Error calculating scores: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to calculate skill scores"}), 500
+
+async def read_ndjson_records(body):
+    """Yield answer records from a streamed NDJSON body."""
+    buffer = b''
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+    if buffer.strip():
+        try:
+            yield json.loads(buffer)
+        except ValueError:
+            yield None
+
+def score_chunk(records, start):
+    return ''.join(score_batch(records, start))
+
+async def stream_scores(records):
+    """Score records chunk by chunk on the blocking pool and yield NDJSON result lines."""
+    chunk = []
+    start = 0
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield await run_blocking(score_chunk, chunk, start)
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield await run_blocking(score_chunk, chunk, start)
+
+async def iterate(items):
+    for item in items:
+        yield item
+
+@app.route('/api/calculate-scores/batch', methods=['POST'])
+async def calculate_scores_batch():
+    """Calculate trait scores for a whole cohort, streaming one NDJSON line per student."""
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            records = read_ndjson_records(request.body)
+        else:
+            # Validate the JSON body up front so errors still get a 400
+            data = await request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get('students')
+            if not isinstance(data, list):
+                raise ValueError("Expected a JSON array of answer records")
+            records = iterate(data)
+        return Response(stream_scores(records), mimetype='application/x-ndjson')
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error calculating batch scores: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to calculate skill scores"}), 500
+
+@app.route('/api/submit-assessment', methods=['POST'])
+async def submit_assessment():
+    """Initiate assessment submission and generate career report in the background."""
+    try:
+        data = await request.get_json()
+        if not data or 'answers' not in data:
+            return jsonify({"error": "Missing answers data"}), 400
+        if not isinstance(data['answers'], dict):
+            return jsonify({"error": "Invalid answers format"}), 400
+
+        # Identical submissions (double clicks, client retries) share one task instead of starting new work
+        task_id, created = await run_blocking(
+            task_store.create_or_attach,
+            str(uuid.uuid4()), {'status': 'queued', 'queued_at': time.time()}, data, submission_key(data)
+        )
+        if not created:
+            task = await run_blocking(task_store.get, task_id) or {}
+            logging.info(f"Duplicate submission attached to task {task_id} ({task.get('status')})")
+            if task.get('status') == 'completed':
+                return jsonify({
+                    "message": "Report already generated",
+                    "task_id": task_id,
+                    "status": "completed",
+                    "report_url": task.get('report_url')
+                }), 200
+            return jsonify({"message": "Report generation already in progress", "task_id": task_id}), 202
+
+        try:
+            schedule_report(data, task_id)
+        except QueueFullError as e:
+            await run_blocking(task_store.delete, task_id)
+            logging.warning(f"Async report queue full, rejecting submission (retry after {e.retry_after}s)")
+            return queue_full_response(e)
+
+        return jsonify({"message": "Report generation started", "task_id": task_id}), 202
+
+    except Exception as e:
+        logging.error(f"Error starting report generation: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to start report generation"}), 500
+
+async def generate_report(data, task_id):
+    """Generate the career report once a report slot is free and update task status."""
+    global avg_report_seconds
+    async with report_slots:
+        started = time.monotonic()
+        queued_at = (await run_blocking(task_store.get, task_id) or {}).get('queued_at')
+        with start_trace('generate_report', origin=queued_at) as trace:
+            if queued_at is not None:
+                trace.add('queue_wait', 0, trace.offset())
+            await run_report(data, task_id, trace)
+        elapsed = time.monotonic() - started
+        avg_report_seconds = elapsed if avg_report_seconds is None else 0.8 * avg_report_seconds + 0.2 * elapsed
+
+async def run_report(data, task_id, trace):
+    """Asyncio version of server.run_report: LLM calls are awaited, everything else runs on the blocking pool."""
+    await run_blocking(task_store.set, task_id, {'status': 'processing'})
+    await run_blocking(publish_event, task_id, 'status', {'status': 'processing'})
+    started = time.perf_counter()
+    deadline = time.monotonic() + REPORT_DEADLINE_SECONDS if REPORT_DEADLINE_SECONDS > 0 else None
+    try:
+        with stage('calculate_scores'):
+            trait_scores = await run_blocking(assessment_manager.calculate_scores, data['answers'])
+        await run_blocking(publish_event, task_id, 'trait_scores', {'trait_scores': trait_scores})
+
+        student_info = student_details(data)
+
+        with stage('extract_career_goal'):
+            career_goal, goal_source = await extract_career_goal_with_source_async(
+                list(data['answers'].values()), trait_scores
+            )
+        if not career_goal:
+            await run_blocking(fail_task, task_id, "Failed to extract career goal", trace)
+            return
+
+        with stage('canonicalize_goal'):
+            career_goal = await run_blocking(canonicalize_goal, career_goal)
+        await run_blocking(publish_event, task_id, 'career_goal', {'career_goal': career_goal})
+
+        context = report_context(trait_scores, student_info)
+        with stage('generate_topic_reports'):
+            report_sections = await generate_topic_reports_async(
+                context, career_goal, student_info['name'],
+                on_section=lambda topic, content: publish_event(task_id, 'section', {'topic': topic, 'content': content}),
+                deadline=deadline
+            )
+
+        report_id = await run_blocking(finish_report, task_id, trace, student_info['name'], career_goal, context,
+                                       report_sections, started)
+        if report_id:
+            await run_blocking(record_example, list(data['answers'].values()), trait_scores, career_goal,
+                               goal_source)
+
+    except Exception as e:
+        logging.error(f"Report generation error: {str(e)}", exc_info=True)
+        await run_blocking(fail_task, task_id, str(e), trace)
+
+@app.route('/api/regenerate-report/<task_id>', methods=['POST'])
+async def regenerate_report(task_id):
+    """Regenerate only the failed, provisional or outdated sections of a report and rebuild its PDF."""
+    try:
+        # Regeneration is a small delta, so it runs on the threaded report scheduler
+        body, status = await run_blocking(start_regeneration, task_id, await request.get_json(silent=True) or {})
+        response = jsonify(body)
+        if status == 503:
+            response.headers['Retry-After'] = str(body['retry_after'])
+        return response, status
+    except Exception as e:
+        logging.error(f"Error starting report regeneration: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to start report regeneration"}), 500
+
+@app.route('/api/task-status/<task_id>', methods=['GET'])
+async def task_status(task_id):
+    """Check the status of a report generation task; ?trace=1 adds its timeline, ?trace=chrome exports it."""
+    task = await run_blocking(task_store.get, task_id)
+    if not task:
+        return jsonify({"error": "Task not found"}), 404
+    trace = task.pop('trace', None)
+    trace_format = request.args.get('trace', '').lower()
+    if trace_format == 'chrome':
+        if trace is None:
+            return jsonify({"error": "Trace not available until the task finishes"}), 404
+        return jsonify(to_chrome_trace(trace))
+    if trace_format in ('1', 'true', 'yes'):
+        task['trace'] = trace
+    if task.get('status') == 'queued':
+        task['queue_position'] = await run_blocking(task_store.queue_position, task_id)
+    return jsonify(task)
+
+async def stream_events(task_id, after):
+    """Yield Server-Sent Events for a task until its final event has been sent."""
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    last_sent = time.monotonic()
+    while True:
+        # Read the record before the events so a task that finished in between is not missed
+        task = await run_blocking(task_store.get, task_id)
+        events = await run_blocking(task_store.events, task_id, after)
+        for seq, event, data in events:
+            yield f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+            after = seq
+            if event in TERMINAL_EVENTS and not data.get('update_pending'):
+                return
+        if events:
+            last_sent = time.monotonic()
+        elif task is None or (task.get('status') in FINISHED_STATUSES and not task.get('update_pending')):
+            return
+        elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+@app.route('/api/report-stream/<task_id>', methods=['GET'])
+async def report_stream(task_id):
+    """Stream report progress (career goal, trait scores, sections, PDF URL) as Server-Sent Events."""
+    if not await run_blocking(task_store.get, task_id):
+        return jsonify({"error": "Task not found"}), 404
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId', '0')
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+    response = Response(
+        stream_events(task_id, after),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.timeout = None  # Streams last as long as the report
+    return response
+
+@app.route('/api/download-report/<filename>', methods=['GET'])
+async def download_report(filename):
+    """Serve a stored report with ETag and Range support."""
+    filename = filename.strip()  # Remove unwanted spaces
+    report = await run_blocking(report_store.get, filename)
+    if report:
+        response = await send_file(
+            report['path'],
+            mimetype='application/pdf',
+            as_attachment=True,
+            attachment_filename=f"{report['student_name'].replace(' ', '_')}_Career_Report.pdf",
+            add_etags=False,
+            cache_timeout=3600
+        )
+        response.set_etag(report['report_id'])
+        await response.make_conditional(request, accept_ranges=True, complete_length=response.content_length)
+        return response
+
+    # Reports written before content addressing are served by file name
+    try:
+        if not filename.endswith('.pdf'):
+            raise NotFound()
+        return await send_from_directory(os.path.abspath(REPORTS_DIR), filename, as_attachment=True)
+    except NotFound:
+        logging.error(f"Report not found: {repr(filename)}")
+        return jsonify({"error": "File not found"}), 404
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Expose pipeline metrics for this worker process in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=3001)
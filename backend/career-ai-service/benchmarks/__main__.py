@@ -0,0 +1,156 @@
+"""Benchmark and load-test suite for the career AI service.
+
+Run from backend/career-ai-service:
+
+    python -m benchmarks --output bench.json
+    python -m benchmarks --suites e2e --concurrency 1 4 16 --compare baseline.json
+
+LLM calls go to the local stand-in provider, so results depend only on this code and
+the configured latency and error rate, never on Gemini quota or network.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import subprocess
+from .common import SERVICE_DIR, configure_environment
+
+SUITES = ('scoring', 'pdf', 'e2e', 'memory')
+LOWER_IS_BETTER = ('seconds', 'mean', 'min', 'p50', 'p95', 'p99', 'max', 'bytes')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Career AI service benchmarks")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Relative change reported as a regression")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeats', type=int, default=3, help="Repetitions for micro-benchmarks (best is kept)")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Seconds per stubbed LLM call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of stubbed LLM calls that fail")
+    parser.add_argument('--llm-cache', default='none', choices=('none', 'memory', 'sqlite'))
+    parser.add_argument('--rpm', type=float, default=100000, help="Process-wide LLM requests per minute")
+    parser.add_argument('--scoring-students', type=int, default=10000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--section-lengths', type=int, nargs='+', default=[500, 2000, 8000, 32000])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--reports-per-client', type=int, default=3)
+    parser.add_argument('--memory-concurrency', type=int, default=8)
+    parser.add_argument('--log-level', default='WARNING')
+    return parser.parse_args(argv)
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SERVICE_DIR, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SERVICE_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return {'commit': revision, 'dirty': bool(dirty)}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def flatten(results, prefix=''):
+    """Map nested results onto {'suite.key.sub': number}."""
+    values = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare(current, baseline, threshold):
+    """Print changes against a baseline run; return the metrics that regressed."""
+    old = flatten(baseline.get('results', {}))
+    new = flatten(current['results'])
+    regressions = []
+    for path in sorted(set(old) & set(new)):
+        name = path.rsplit('.', 1)[-1]
+        if old[path] == 0 or name == 'count':
+            continue
+        change = new[path] / old[path] - 1
+        if name.endswith('per_second'):
+            regressed = change < -threshold
+        elif name.endswith(LOWER_IS_BETTER):
+            regressed = change > threshold
+        else:
+            continue
+        marker = '  REGRESSION' if regressed else ''
+        print(f"{path:60} {old[path]:>14} -> {new[path]:>14} ({change:+.1%}){marker}", file=sys.stderr)
+        if regressed:
+            regressions.append(path)
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+    data_dir = tempfile.mkdtemp(prefix='career-bench-')
+    configure_environment(args, data_dir)
+    sys.path.insert(0, SERVICE_DIR)
+
+    # Suites import the service lazily so the environment above is in place first
+    from . import bench_e2e, bench_pdf, bench_scoring
+    runners = {
+        'scoring': bench_scoring.run,
+        'pdf': bench_pdf.run,
+        'e2e': bench_e2e.run,
+        'memory': bench_e2e.run_memory,
+    }
+
+    results = {}
+    try:
+        for suite in SUITES:
+            if suite not in args.suites:
+                continue
+            print(f"Running {suite} benchmark...", file=sys.stderr)
+            started = time.perf_counter()
+            results[suite] = runners[suite](args)
+            # Importing the server reconfigures logging; keep benchmark output readable
+            logging.getLogger().setLevel(args.log_level)
+            print(f"  done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import time
+import logging
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from .common import random_students, summarize
+
+POLL_INTERVAL = 0.02  # Seconds between task-status polls
+REPORT_TIMEOUT = 600  # Seconds before a report counts as timed out
+
+
+def run_report(client, payload):
+    """Submit one assessment and poll until it finishes; return (status, seconds)."""
+    started = time.perf_counter()
+    response = client.post('/api/submit-assessment', json=payload)
+    if response.status_code != 202:
+        return f"rejected_{response.status_code}", time.perf_counter() - started
+    task_id = response.get_json()['task_id']
+    while time.perf_counter() - started < REPORT_TIMEOUT:
+        status = client.get(f'/api/task-status/{task_id}').get_json().get('status')
+        if status in ('completed', 'error'):
+            return status, time.perf_counter() - started
+        time.sleep(POLL_INTERVAL)
+    return 'timeout', time.perf_counter() - started
+
+
+def run_level(app, students, concurrency):
+    """Closed loop: each of `concurrency` clients submits its share of students one after another."""
+    shares = [students[i::concurrency] for i in range(concurrency)]
+
+    def client_loop(share):
+        client = app.test_client()
+        return [run_report(client, payload) for payload in share]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = [outcome for results in pool.map(client_loop, shares) for outcome in results]
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = [seconds for status, seconds in outcomes if status == 'completed']
+    return {
+        'reports': len(outcomes),
+        'statuses': statuses,
+        'latency_seconds': summarize(latencies),
+        'elapsed_seconds': round(elapsed, 3),
+        'reports_per_second': round(len(latencies) / elapsed, 3) if elapsed else None,
+    }
+
+
+def load_server(args):
+    """Import the Flask app (starting its workers) and quieten the logging it configures."""
+    import server
+    logging.getLogger().setLevel(args.log_level)
+    return server
+
+
+def run(args):
+    """Submit-to-completion latency percentiles at rising client concurrency."""
+    server = load_server(args)
+
+    results = {}
+    for level, concurrency in enumerate(args.concurrency):
+        students = random_students(concurrency * args.reports_per_client, args.seed + level)
+        results[str(concurrency)] = run_level(server.app, students, concurrency)
+    return results
+
+
+def run_memory(args):
+    """Python heap high-water mark while reports are in flight, per concurrent report."""
+    server = load_server(args)
+
+    concurrency = args.memory_concurrency
+    students = random_students(concurrency, args.seed + 1000)
+    # Only allocations made after tracing starts are counted, so the peak is what the reports added
+    tracemalloc.start()
+    try:
+        level = run_level(server.app, students, concurrency)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'concurrency': concurrency,
+        'statuses': level['statuses'],
+        'peak_bytes': peak,
+        'peak_bytes_per_report': peak // concurrency,
+        'retained_bytes': current,
+        'scope': 'server process Python heap; forked render processes are not included',
+    }
@@ -0,0 +1,48 @@
+import os
+import tempfile
+from .common import best_of
+
+SENTENCE = "This part of the plan explains the next practical step and why it matters for the career. "
+
+
+def section_text(length):
+    """Report-like section content of roughly `length` characters."""
+    paragraphs = []
+    heading = 1
+    while sum(len(paragraph) for paragraph in paragraphs) < length:
+        paragraphs.append(f"{heading}. Key area {heading}")
+        paragraphs.append(SENTENCE * 6)
+        heading += 1
+    return '\n\n'.join(paragraphs)[:length]
+
+
+def run(args):
+    """PDF render time against section length, with cold and warm fragment caches."""
+    from api.prompt_manager import TOPICS
+    from reports.pdf_generator import PDF_FRAGMENT_CACHE, generate_pdf_report
+    from reports.report_builder import build_report_data
+
+    results = {'fragment_cache': PDF_FRAGMENT_CACHE, 'sections': len(TOPICS), 'lengths': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for length in args.section_lengths:
+            content = section_text(length)
+            counter = iter(range(10 ** 6))
+
+            def render(goal):
+                report_data = build_report_data("Benchmark Student", goal, {topic: content for topic in TOPICS})
+                filename = os.path.join(directory, f"{length}.pdf")
+                generate_pdf_report(report_data, filename)
+                return os.path.getsize(filename)
+
+            # A fresh goal every run misses the fragment cache; repeating one goal hits it
+            cold = best_of(lambda: render(f"Cold Goal {length} {next(counter)}"), args.repeats)
+            warm_goal = f"Warm Goal {length}"
+            pdf_bytes = render(warm_goal)
+            warm = best_of(lambda: render(warm_goal), args.repeats)
+
+            results['lengths'][str(length)] = {
+                'cold_seconds': round(cold, 4),
+                'warm_seconds': round(warm, 4),
+                'pdf_bytes': pdf_bytes,
+            }
+    return results
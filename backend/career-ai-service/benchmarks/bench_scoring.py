@@ -0,0 +1,27 @@
+from .common import best_of, random_students
+
+
+def run(args):
+    """Throughput of single and batch trait scoring."""
+    from api.assessment_manager import AssessmentManager
+
+    manager = AssessmentManager()
+    answer_sets = [student['answers'] for student in random_students(args.scoring_students, args.seed)]
+
+    single_seconds = best_of(lambda: [manager.calculate_scores(answers) for answers in answer_sets], args.repeats)
+    results = {
+        'students': len(answer_sets),
+        'single': {
+            'seconds': round(single_seconds, 4),
+            'students_per_second': round(len(answer_sets) / single_seconds, 1),
+        },
+        'batch': {},
+    }
+    for size in args.batch_sizes:
+        chunks = [answer_sets[i:i + size] for i in range(0, len(answer_sets), size)]
+        seconds = best_of(lambda: [manager.calculate_scores_batch(chunk) for chunk in chunks], args.repeats)
+        results['batch'][str(size)] = {
+            'seconds': round(seconds, 4),
+            'students_per_second': round(len(answer_sets) / seconds, 1),
+        }
+    return results
@@ -0,0 +1,96 @@
+import os
+import json
+import math
+import random
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCORING_PATH = os.path.join(SERVICE_DIR, 'config', 'scoring_system.json')
+
+# Free-text answers that steer the local provider towards different career goals
+GOAL_HINTS = [
+    "I enjoy coding and building software",
+    "I like statistics and working with data",
+    "I want to study medicine and biology",
+    "I love drawing and creative design",
+    "I want to run a startup business",
+    "I am interested in law and justice",
+    "I would like to teach at a school",
+]
+
+
+def configure_environment(args, data_dir):
+    """Point the service at throwaway storage and the local LLM stand-in; call before importing it."""
+    os.environ.update({
+        'LLM_PROVIDER': 'local',
+        'LOCAL_PROVIDER_LATENCY': str(args.llm_latency),
+        'LOCAL_PROVIDER_ERROR_RATE': str(args.error_rate),
+        'LOCAL_PROVIDER_SEED': str(args.seed),
+        'LLM_CACHE_BACKEND': args.llm_cache,
+        'GEMINI_REQUESTS_PER_MINUTE': str(args.rpm),
+        'CAREER_AI_DATA_DIR': data_dir,
+        'REPORTS_DIR': os.path.join(data_dir, 'reports'),
+        'TASK_STORE_BACKEND': 'sqlite',
+    })
+
+
+def load_questions():
+    """Return {question_id: [options]} from the scoring system."""
+    with open(SCORING_PATH, 'r') as f:
+        scoring_system = json.load(f)
+    questions = {}
+    for question_id, question in scoring_system.items():
+        options = sorted({option for weights in question.values() for option in weights})
+        if options:
+            questions[question_id] = options
+    return questions
+
+
+def random_answers(rng, questions):
+    """One student's answers: a random option per question plus a free-text goal hint."""
+    answers = {question_id: rng.choice(options) for question_id, options in questions.items()}
+    answers['goal_hint'] = rng.choice(GOAL_HINTS)
+    return answers
+
+
+def random_students(count, seed):
+    rng = random.Random(seed)
+    questions = load_questions()
+    return [
+        {'studentName': f"Student {i}", 'age': rng.randint(14, 22), 'answers': random_answers(rng, questions)}
+        for i in range(count)
+    ]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    """Latency summary in seconds."""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 4),
+        'min': round(min(values), 4),
+        'p50': round(percentile(values, 50), 4),
+        'p95': round(percentile(values, 95), 4),
+        'p99': round(percentile(values, 99), 4),
+        'max': round(max(values), 4),
+    }
+
+
+def best_of(fn, repeats):
+    """Run fn repeatedly and return the fastest wall time in seconds."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
@@ -0,0 +1,255 @@
+"""Generate career reports for a whole cohort from a file, without going through the web tier.
+
+Input is NDJSON (one submission per line, as posted to /api/submit-assessment, optionally with an "id")
+or CSV (id, studentName, age, academicInfo, interests columns; every other column is an answer):
+
+    python bulk_reports.py students.csv --output-dir reports/school-a --workers 8
+
+Finished records are appended to checkpoint.jsonl in the output directory, so rerunning the same
+command after a crash only generates what is missing. manifest.json lists every output and failure.
+"""
+import os
+import re
+import sys
+import csv
+import json
+import time
+import signal
+import logging
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+
+# Load environment variables before the service modules read their configuration
+load_dotenv()
+
+from api.assessment_manager import AssessmentManager
+from api.gemini_client import setup_gemini_api
+from api.goal_canonicalizer import canonicalize_goal
+from api.goal_classifier import record_example
+from api.prompt_manager import (
+    PROVISIONAL_PLACEHOLDER, extract_career_goal_with_source, fill_missing_sections, generate_topic_reports
+)
+from reports.render_pool import render_pdf_report, start_render_pool
+from reports.report_builder import build_report_data, report_context, student_details
+
+BULK_WORKERS = int(os.getenv('BULK_WORKERS', '8'))  # Reports generated at once; the rate limiter sets throughput
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+MANIFEST_FILE = 'manifest.json'
+
+STUDENT_FIELDS = ('studentName', 'age', 'academicInfo', 'interests')
+
+
+def read_records(path):
+    """Return [(record_id, submission)] from an NDJSON or CSV file; unreadable rows become None submissions."""
+    records = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if path.lower().endswith('.csv'):
+            for number, row in enumerate(csv.DictReader(f), 1):
+                submission = {field: row[field] for field in STUDENT_FIELDS if row.get(field)}
+                submission['answers'] = {
+                    column: value for column, value in row.items()
+                    if column and column != 'id' and column not in STUDENT_FIELDS and value
+                }
+                records.append((str(row.get('id') or number), submission))
+        else:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    submission = json.loads(line)
+                except ValueError:
+                    records.append((str(number), None))
+                    continue
+                record_id = submission.get('id', number) if isinstance(submission, dict) else number
+                records.append((str(record_id), submission))
+    return records
+
+
+def output_name(record_id, student_name):
+    name = re.sub(r'[^A-Za-z0-9]+', '_', f"{record_id}_{student_name}").strip('_')
+    return f"{name}_Career_Report.pdf"
+
+
+def generate_report(assessment_manager, submission, output_dir, record_id):
+    """Run the report pipeline for one submission and write its PDF; return the manifest entry."""
+    if not isinstance(submission, dict) or not isinstance(submission.get('answers'), dict) or not submission['answers']:
+        raise ValueError("Invalid answers format")
+
+    trait_scores = assessment_manager.calculate_scores(submission['answers'])
+    student_info = student_details(submission)
+    answers = list(submission['answers'].values())
+    career_goal, goal_source = extract_career_goal_with_source(answers, trait_scores)
+    career_goal = canonicalize_goal(career_goal)
+
+    context = report_context(trait_scores, student_info)
+    sections = generate_topic_reports(context, career_goal, student_info['name'])
+    sections, provisional = fill_missing_sections(career_goal, sections)
+    if all(content == PROVISIONAL_PLACEHOLDER for content in sections.values()):
+        raise RuntimeError("Failed to generate report sections")
+
+    filename = output_name(record_id, student_info['name'])
+    path = os.path.join(output_dir, filename)
+    # Render beside the target and move it into place, so a crash never leaves a partial PDF behind
+    staging_path = f"{path}.partial"
+    render_pdf_report(build_report_data(student_info['name'], career_goal, sections), staging_path)
+    os.replace(staging_path, path)
+    record_example(answers, trait_scores, career_goal, goal_source)
+    return {'pdf': filename, 'career_goal': career_goal, 'provisional_sections': provisional}
+
+
+class Checkpoint:
+    """Append-only log of finished records; the latest entry per record id wins."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        content = ''
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        for line in content.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # A crash mid-write leaves at most one torn line
+            self.entries[entry['id']] = entry
+        self._file = open(path, 'a', encoding='utf-8')
+        if content and not content.endswith('\n'):
+            # Start on a fresh line after a torn final entry
+            self._file.write('\n')
+
+    def done(self, record_id, retry_failed):
+        entry = self.entries.get(record_id)
+        return entry is not None and (entry['status'] == 'completed' or not retry_failed)
+
+    def add(self, entry):
+        self.entries[entry['id']] = entry
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def write_manifest(output_dir, input_path, records, checkpoint, elapsed):
+    entries = [checkpoint.entries[record_id] for record_id, _ in records if record_id in checkpoint.entries]
+    completed = [entry for entry in entries if entry['status'] == 'completed']
+    failed = [entry for entry in entries if entry['status'] == 'error']
+    manifest = {
+        'input': os.path.abspath(input_path),
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'records': len(records),
+        'completed': len(completed),
+        'failed': len(failed),
+        'pending': len(records) - len(entries),
+        'provisional': sum(1 for entry in completed if entry.get('provisional_sections')),
+        'elapsed_seconds': round(elapsed, 1),
+        'reports': completed,
+        'failures': failed,
+    }
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return manifest
+
+
+def run(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    records = read_records(args.input)
+    ids = [record_id for record_id, _ in records]
+    if len(set(ids)) != len(ids):
+        print("Record ids must be unique for checkpointing to work", file=sys.stderr)
+        return 2
+
+    try:
+        setup_gemini_api()
+    except Exception as e:
+        print(f"Failed to initialize Gemini API: {str(e)}", file=sys.stderr)
+        return 2
+
+    # Fork the render processes before any worker threads start
+    start_render_pool()
+    assessment_manager = AssessmentManager()
+    checkpoint = Checkpoint(os.path.join(args.output_dir, CHECKPOINT_FILE))
+    pending = [(record_id, submission) for record_id, submission in records
+               if not checkpoint.done(record_id, args.retry_failed)]
+    print(f"{len(records)} records, {len(records) - len(pending)} already done, {len(pending)} to generate",
+          file=sys.stderr)
+
+    def job(record_id, submission):
+        started = time.monotonic()
+        try:
+            entry = generate_report(assessment_manager, submission, args.output_dir, record_id)
+            entry.update(status='completed')
+        except Exception as e:
+            logging.error(f"Report for record {record_id} failed: {str(e)}", exc_info=True)
+            entry = {'status': 'error', 'error': str(e)}
+        entry.update(id=record_id, seconds=round(time.monotonic() - started, 1))
+        return entry
+
+    started = time.monotonic()
+    done = 0
+
+    def record(future):
+        nonlocal done
+        entry = future.result()
+        checkpoint.add(entry)
+        done += 1
+        detail = entry.get('pdf') if entry['status'] == 'completed' else entry['error']
+        print(f"[{done}/{len(pending)}] {entry['id']}: {entry['status']} ({entry['seconds']}s) {detail}", file=sys.stderr)
+
+    pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='bulk')
+    queue = iter(pending)
+    running = set()
+    try:
+        while True:
+            # Keep a bounded number of records in flight so large files do not pile up in memory
+            for record_id, submission in queue:
+                running.add(pool.submit(job, record_id, submission))
+                if len(running) >= args.workers * 2:
+                    break
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record(future)
+                running.discard(future)
+    except KeyboardInterrupt:
+        print("Interrupted; finishing the records already being generated", file=sys.stderr)
+        raise
+    finally:
+        # Drop records that have not started, and keep what the running ones produce
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future in running:
+            if not future.cancelled():
+                record(future)
+        checkpoint.close()
+        manifest = write_manifest(args.output_dir, args.input, records, checkpoint, time.monotonic() - started)
+
+    print(f"{manifest['completed']} completed, {manifest['failed']} failed, {manifest['pending']} pending; "
+          f"manifest written to {os.path.join(args.output_dir, MANIFEST_FILE)}", file=sys.stderr)
+    return 1 if manifest['failed'] or manifest['pending'] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate career reports in bulk from NDJSON or CSV answer records")
+    parser.add_argument('input', help="NDJSON or CSV file of answer records")
+    parser.add_argument('--output-dir', required=True, help="Directory for PDFs, checkpoint and manifest")
+    parser.add_argument('--workers', type=int, default=BULK_WORKERS)
+    parser.add_argument('--retry-failed', action='store_true', help="Retry records that failed in an earlier run")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s: %(message)s', force=True)
+    # Stop on SIGTERM the same way as on Ctrl-C, so finished records still reach the checkpoint
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        return run(args)
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+DATA_DIR = os.getenv('CAREER_AI_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
+
+# Fragment cache configuration
+PDF_FRAGMENT_DIR = os.getenv('PDF_FRAGMENT_DIR', os.path.join(DATA_DIR, 'pdf_fragments'))
+PDF_FRAGMENT_MAX_BYTES = int(os.getenv('PDF_FRAGMENT_MAX_BYTES', str(512 * 1024 * 1024)))
+FRAGMENT_VERSION = 1  # Bump when section layout or styles change
+PRUNE_INTERVAL = 100  # Fragment writes between quota checks
+
+
+class FragmentCache:
+    """Directory of rendered per-section PDF fragments keyed by (goal, section, content)."""
+
+    def __init__(self, directory=PDF_FRAGMENT_DIR, max_bytes=PDF_FRAGMENT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, goal, section, content):
+        raw = json.dumps([FRAGMENT_VERSION, goal, section, content], ensure_ascii=False)
+        digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.pdf")
+
+    def get_or_render(self, goal, section, content, render):
+        """Return fragment PDF bytes, calling render(section, content) on a miss."""
+        path = self._path(goal, section, content)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used for pruning
+            return data
+        except FileNotFoundError:
+            pass
+
+        data = render(section, content)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write atomically; other render processes may be reading the same fragment
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Failed to cache PDF fragment for {section}: {str(e)}")
+            return data
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+        return data
+
+    def prune(self):
+        """Delete least recently used fragments until the cache is under its byte quota."""
+        fragments = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.pdf'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    fragments.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in fragments)
+        for _, size, path in sorted(fragments):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -1,11 +1,20 @@
+import io
+import os
+import tempfile
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+from pypdf import PdfReader, PdfWriter
+from .fragment_cache import FragmentCache
 
 # PDF configuration
 PAGE_MARGIN = 0.5 * inch
+PDF_FRAGMENT_CACHE = os.getenv('PDF_FRAGMENT_CACHE', 'true').lower() in ('1', 'true', 'yes')
+
+# Sections written for one student; every other section depends only on the career goal
+PER_STUDENT_SECTIONS = ('personal_traits',)
 
 # Initialize styles
 styles = getSampleStyleSheet()
@@ -25,17 +34,35 @@ styles.add(ParagraphStyle(
     fontName='Helvetica-Bold'
 ))
 
-def generate_pdf_report(report_data, filename):
-    """Generate professional PDF report."""
-    doc = SimpleDocTemplate(
-        filename,
+TOC_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.grey),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,0), 12),
+    ('BOTTOMPADDING', (0,0), (-1,0), 12),
+    ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+    ('GRID', (0,0), (-1,-1), 1, colors.black)
+])
+
+_fragment_cache = None
+
+def _new_doc(target):
+    return SimpleDocTemplate(
+        target,
         pagesize=letter,
         leftMargin=PAGE_MARGIN,
         rightMargin=PAGE_MARGIN,
         topMargin=PAGE_MARGIN,
         bottomMargin=PAGE_MARGIN
     )
-    
+
+def _section_title(section):
+    return section.replace('_', ' ').title()
+
+def _front_matter_elements(report_data, page_numbers=None):
+    """Cover page and table of contents."""
+    page_numbers = page_numbers or {}
     elements = []
     
     # Cover Page
@@ -49,43 +76,93 @@ def generate_pdf_report(report_data, filename):
     # Table of Contents
     toc = [
         ["Section", "Page"],
-        *[[section.replace('_', ' ').title(), ""] for section in report_data['report'].keys()]
+        *[[_section_title(section), str(page_numbers.get(section, ""))] for section in report_data['report'].keys()]
     ]
     
     toc_table = Table(toc, colWidths=[4*inch, 1*inch])
-    toc_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.grey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 12),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-        ('GRID', (0,0), (-1,-1), 1, colors.black)
-    ]))
+    toc_table.setStyle(TOC_STYLE)
     
     elements.append(Paragraph("Table of Contents", styles['Heading1']))
     elements.append(Spacer(1, 12))
     elements.append(toc_table)
+    return elements
+
+def _section_elements(section, content):
+    """Heading and paragraphs for one report section."""
+    elements = [Paragraph(_section_title(section), styles['Heading1']), Spacer(1, 12)]
+    
+    paragraphs = content.split('\n\n')
+    for para in paragraphs:
+        if para.strip():
+            elements.append(Paragraph(para.strip(), styles['Content']))
+            elements.append(Spacer(1, 6))
+    return elements
+
+def render_elements(elements):
+    """Lay out flowables into an in-memory PDF and return its bytes."""
+    buffer = io.BytesIO()
+    _new_doc(buffer).build(elements)
+    return buffer.getvalue()
+
+def render_section(section, content):
+    return render_elements(_section_elements(section, content))
+
+def get_fragment_cache():
+    global _fragment_cache
+    if _fragment_cache is None:
+        _fragment_cache = FragmentCache()
+    return _fragment_cache
+
+def assemble_pdf_report(report_data, filename):
+    """Build a report from cached goal-level section fragments plus per-student pages."""
+    cache = get_fragment_cache()
+    fragments = []
+    for section, content in report_data['report'].items():
+        if section in PER_STUDENT_SECTIONS:
+            data = render_section(section, content)
+        else:
+            data = cache.get_or_render(report_data['career_goal'], section, content, render_section)
+        fragments.append((section, PdfReader(io.BytesIO(data))))
+
+    # Number sections from the fragments' page counts; re-render if the front matter grows
+    front_pages = 2
+    while True:
+        page_numbers, page = {}, front_pages + 1
+        for section, reader in fragments:
+            page_numbers[section] = page
+            page += len(reader.pages)
+        front = PdfReader(io.BytesIO(render_elements(_front_matter_elements(report_data, page_numbers))))
+        if len(front.pages) == front_pages:
+            break
+        front_pages = len(front.pages)
+
+    writer = PdfWriter()
+    writer.append(front)
+    for _, reader in fragments:
+        writer.append(reader)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        writer.write(f)
+    os.replace(tmp_path, filename)
+    return filename
+
+def generate_pdf_report(report_data, filename):
+    """Generate professional PDF report."""
+    if PDF_FRAGMENT_CACHE:
+        return assemble_pdf_report(report_data, filename)
+
+    elements = _front_matter_elements(report_data)
     elements.append(PageBreak())
     
     # Content Sections
     for section, content in report_data['report'].items():
-        elements.append(Paragraph(section.replace('_', ' ').title(), styles['Heading1']))
-        elements.append(Spacer(1, 12))
-        
-        paragraphs = content.split('\n\n')
-        for para in paragraphs:
-            if para.strip():
-                elements.append(Paragraph(para.strip(), styles['Content']))
-                elements.append(Spacer(1, 6))
-        
+        elements.extend(_section_elements(section, content))
         elements.append(PageBreak())
     
-    doc.build(elements)
+    _new_doc(filename).build(elements)
     return filename
 
-
 # from reportlab.lib.pagesizes import letter
 # from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
 # from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -0,0 +1,90 @@
+import os
+import json
+import signal
+import time
+import zlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .pdf_generator import generate_pdf_report
+
+# Render processes are forked; where fork is unavailable rendering stays in-process by default
+CAN_FORK = 'fork' in multiprocessing.get_all_start_methods()
+
+# Rendering configuration (0 workers renders in the calling thread)
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', str(max(1, (os.cpu_count() or 2) // 2) if CAN_FORK else 0)))
+PDF_RENDER_TIMEOUT = int(os.getenv('PDF_RENDER_TIMEOUT', '300'))  # Seconds
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def serialize_report(report_data):
+    """Pack report data into compressed JSON for the trip to a render process."""
+    return zlib.compress(json.dumps(report_data, ensure_ascii=False).encode('utf-8'))
+
+
+def deserialize_report(payload):
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def _render_job(payload, filename):
+    """Render one report inside a pool process; return the render time in seconds."""
+    started = time.perf_counter()
+    generate_pdf_report(deserialize_report(payload), filename)
+    return time.perf_counter() - started
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def _ignore_interrupts():
+    """Leave Ctrl-C to the parent, which finishes the renders already submitted before it exits."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned children would re-import server.py as their main module, so fork instead
+            context = multiprocessing.get_context('fork' if CAN_FORK else 'spawn')
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS, mp_context=context, initializer=_ignore_interrupts
+            )
+        return _pool
+
+
+def start_render_pool():
+    """Fork the render processes up front, before the server starts its worker threads."""
+    if PDF_RENDER_WORKERS > 0:
+        _get_pool().submit(_warm_up).result()
+        logging.info(f"PDF render pool started with {PDF_RENDER_WORKERS} processes")
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def render_pdf_report(report_data, filename):
+    """Render a report PDF on the render process pool; return the render time in seconds."""
+    payload = serialize_report(report_data)
+    if PDF_RENDER_WORKERS <= 0:
+        return _render_job(payload, filename)
+
+    try:
+        render_seconds = _get_pool().submit(_render_job, payload, filename).result(timeout=PDF_RENDER_TIMEOUT)
+    except BrokenProcessPool:
+        logging.error("PDF render pool crashed; restarting it and rendering in-process")
+        _reset_pool()
+        render_seconds = _render_job(payload, filename)
+
+    logging.info(f"Rendered {os.path.basename(filename)} in {render_seconds:.2f}s ({len(payload)} bytes of report data)")
+    return render_seconds
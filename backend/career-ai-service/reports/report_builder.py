@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 
 def build_report_data(student_name, career_goal, report_sections):
@@ -7,4 +8,25 @@ def build_report_data(student_name, career_goal, report_sections):
         'career_goal': career_goal,
         'generated_date': datetime.now().strftime('%B %d, %Y'),
         'report': report_sections
-    }
\ No newline at end of file
+    }
+
+def student_details(data):
+    """Student details used in the report context."""
+    return {
+        'name': data.get('studentName', 'Student').strip(),
+        'age': str(data.get('age', 'Not provided')),
+        'academic_info': str(data.get('academicInfo', 'Not provided')),
+        'interests': str(data.get('interests', 'Not provided')),
+        'achievements': [
+            str(data.get('answers', {}).get('question13', 'None')),
+            str(data.get('answers', {}).get('question30', 'None'))
+        ]
+    }
+
+def report_context(trait_scores, student_info):
+    """Trait scores and student details passed along with the report prompts."""
+    context = f"""
+        Trait Scores: {json.dumps(trait_scores)}
+        Student Info: {json.dumps(student_info)}
+        """
+    return context.strip()
@@ -0,0 +1,102 @@
+import os
+import re
+import time
+import hashlib
+import logging
+from api.sqlite_util import ThreadLocalConnection
+
+# Report storage configuration
+REPORT_STORE_QUOTA_BYTES = int(os.getenv('REPORT_STORE_QUOTA_BYTES', str(2 * 1024 * 1024 * 1024)))
+ACCESS_TOUCH_INTERVAL = 60  # Seconds between last-access updates for the same report
+
+REPORT_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def file_digest(path):
+    """Return the sha256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReportStore:
+    """Content-addressed PDF storage with a metadata index and LRU eviction under a byte quota."""
+
+    def __init__(self, directory, quota_bytes=REPORT_STORE_QUOTA_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.quota_bytes = quota_bytes
+        self._conn = ThreadLocalConnection(os.path.join(self.directory, 'index.sqlite3'))
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS reports (
+                report_id TEXT PRIMARY KEY,
+                student_name TEXT NOT NULL,
+                task_id TEXT,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_reports_access ON reports (last_access)")
+
+    def path(self, report_id):
+        return os.path.join(self.directory, f"{report_id}.pdf")
+
+    def staging_path(self, task_id):
+        """Temporary path to render a report into before it is stored."""
+        return os.path.join(self.directory, f".{task_id}.pdf.tmp")
+
+    def put(self, source_path, student_name, task_id=None):
+        """Move a rendered PDF into the store and return its report id."""
+        report_id = file_digest(source_path)
+        size = os.path.getsize(source_path)
+        os.replace(source_path, self.path(report_id))
+        now = time.time()
+        self._conn().execute(
+            """INSERT INTO reports (report_id, student_name, task_id, size, created_at, last_access)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(report_id) DO UPDATE SET task_id = excluded.task_id, last_access = excluded.last_access""",
+            (report_id, student_name, task_id, size, now, now)
+        )
+        self.evict(keep=report_id)
+        return report_id
+
+    def get(self, report_id):
+        """Return metadata for a stored report and mark it as recently used, or None."""
+        if not REPORT_ID_PATTERN.match(report_id or ''):
+            return None
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT student_name, task_id, size, last_access FROM reports WHERE report_id = ?", (report_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[3] > ACCESS_TOUCH_INTERVAL:
+            conn.execute("UPDATE reports SET last_access = ? WHERE report_id = ?", (now, report_id))
+        return {'report_id': report_id, 'student_name': row[0], 'task_id': row[1], 'size': row[2], 'path': self.path(report_id)}
+
+    def usage(self):
+        """Total bytes of stored reports."""
+        return self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+
+    def evict(self, keep=None):
+        """Delete least recently downloaded reports until usage fits the quota."""
+        conn = self._conn()
+        total = self.usage()
+        if total <= self.quota_bytes:
+            return
+        rows = conn.execute("SELECT report_id, size FROM reports ORDER BY last_access").fetchall()
+        for report_id, size in rows:
+            if total <= self.quota_bytes:
+                break
+            if report_id == keep:
+                continue
+            try:
+                os.remove(self.path(report_id))
+            except FileNotFoundError:
+                pass
+            conn.execute("DELETE FROM reports WHERE report_id = ?", (report_id,))
+            total -= size
+            logging.info(f"Evicted report {report_id} ({size} bytes)")
@@ -1,29 +1,63 @@
 # D:\new backup latest\career-guide - Copy\backend\career-ai-service\app.py
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory, Response, stream_with_context
+from werkzeug.exceptions import NotFound
 from flask_cors import CORS
 import logging
 import json
 import os
+import queue
+import atexit
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
-from api.prompt_manager import extract_career_goal, generate_topic_reports
+from api.prompt_manager import (
+    PROVISIONAL_PLACEHOLDER, extract_career_goal_with_source, fill_missing_sections, generate_topic_reports,
+    is_failed_section, section_record, stale_sections
+)
+from api.cache_warmup import CACHE_WARMUP_HOUR, warmup_loop
 from api.gemini_client import setup_gemini_api
+from api.goal_canonicalizer import canonicalize_goal
+from api.goal_classifier import record_example
 from api.assessment_manager import AssessmentManager
-from reports.report_builder import build_report_data
-from reports.pdf_generator import generate_pdf_report
+from api.job_scheduler import JobScheduler, QueueFullError
+from api.metrics import PDF_BYTES, REGISTRY, REPORTS, STAGE_SECONDS, counter, gauge
+from api.resilience import circuit_breaker, concurrency_limiter
+from api.response_cache import get_response_cache
+from api.task_store import FINISHED_STATUSES, SUBMISSION_FIELDS, get_task_store, recover_orphans, submission_key
+from api.tracing import span, start_trace, to_chrome_trace
+from reports.report_builder import build_report_data, report_context, student_details
+from reports.render_pool import render_pdf_report, start_render_pool
+from reports.report_store import ReportStore
 import threading
+import time
 import uuid
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
+# Configure logging (force replaces the console handler installed by api.gemini_client on import)
+log_handlers = [logging.FileHandler('career_guidance.log'), logging.StreamHandler()]
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s: %(message)s',
-    handlers=[logging.FileHandler('career_guidance.log'), logging.StreamHandler()]
+    handlers=log_handlers,
+    force=True
 )
 
+# Fork PDF render processes before any worker threads exist; they keep writing logs directly
+start_render_pool()
+
+# In this process, hand log records to a listener thread so request and report threads never wait on log I/O
+log_queue = queue.SimpleQueue()
+root_logger = logging.getLogger()
+for handler in log_handlers:
+    root_logger.removeHandler(handler)
+root_logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 app = Flask(__name__)
 CORS(app)
 
@@ -38,11 +72,93 @@ except Exception as e:
     exit(1)
 
 # Define report storage directory
-REPORTS_DIR = "D:/new backup latest/career-guide - Copy/backend/career-ai-service/reportss"
+REPORTS_DIR = os.getenv('REPORTS_DIR', "D:/new backup latest/career-guide - Copy/backend/career-ai-service/reportss")
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-# Dictionary to track task statuses
-tasks = {}
+# Content-addressed report files with an LRU byte quota
+report_store = ReportStore(REPORTS_DIR)
+app.use_x_sendfile = os.getenv('USE_X_SENDFILE', 'false').lower() in ('1', 'true', 'yes')
+
+# Task status records shared by all worker processes
+task_store = get_task_store()
+TASK_MAINTENANCE_INTERVAL = int(os.getenv('TASK_MAINTENANCE_INTERVAL', '60'))  # Seconds
+
+# Report progress streaming
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', '0.5'))  # Seconds between event checks
+STREAM_HEARTBEAT_INTERVAL = 15  # Seconds between keep-alive comments
+STREAM_RETRY_MS = 3000  # Client reconnect delay
+TERMINAL_EVENTS = ('completed', 'report_updated', 'error')  # completed is not final while an update is pending
+
+# Report jobs run on a bounded worker pool; light scoring work gets its own lane
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '4'))
+REPORT_QUEUE_SIZE = int(os.getenv('REPORT_QUEUE_SIZE', '100'))
+FAST_LANE_WORKERS = int(os.getenv('FAST_LANE_WORKERS', '4'))
+FAST_LANE_QUEUE_SIZE = int(os.getenv('FAST_LANE_QUEUE_SIZE', '200'))
+FAST_LANE_TIMEOUT = 10  # Seconds to wait for a fast-lane job
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '1000'))  # Students scored per vectorized pass
+REPORT_DEADLINE_SECONDS = float(os.getenv('REPORT_DEADLINE_SECONDS', '300'))  # Section budget per report, 0 for none
+
+report_scheduler = JobScheduler('report', REPORT_WORKERS, REPORT_QUEUE_SIZE)
+fast_scheduler = JobScheduler('fast', FAST_LANE_WORKERS, FAST_LANE_QUEUE_SIZE)
+
+def cache_hit_ratio():
+    cache = get_response_cache()
+    total = cache.hits + cache.misses
+    return cache.hits / total if total else 0.0
+
+# Values read when /metrics is scraped
+BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+gauge('career_report_queue_depth', "Report jobs waiting for a worker", fn=report_scheduler.queue_depth)
+gauge('career_report_jobs_in_flight', "Report jobs being processed", fn=report_scheduler.in_flight)
+gauge('career_fast_queue_depth', "Fast-lane jobs waiting for a worker", fn=fast_scheduler.queue_depth)
+gauge('career_gemini_calls_in_flight', "Gemini calls currently in flight", fn=lambda: concurrency_limiter.in_flight)
+gauge('career_gemini_concurrency_limit', "Current adaptive Gemini concurrency limit", fn=lambda: concurrency_limiter.limit)
+gauge('career_gemini_circuit_state', "Gemini circuit breaker state (0 closed, 1 half open, 2 open)",
+      fn=lambda: BREAKER_STATES[circuit_breaker.state])
+gauge('career_llm_cache_hit_ratio', "Share of LLM cache lookups that were hits", fn=cache_hit_ratio)
+counter('career_llm_cache_hits_total', "LLM cache hits", fn=lambda: get_response_cache().hits)
+counter('career_llm_cache_misses_total', "LLM cache misses", fn=lambda: get_response_cache().misses)
+gauge('career_report_store_bytes', "Disk usage of stored PDF reports", fn=report_store.usage)
+
+def task_maintenance():
+    """Expire finished tasks and recover tasks orphaned by dead workers."""
+    while True:
+        try:
+            purged = task_store.purge_expired()
+            if purged:
+                logging.info(f"Purged {purged} expired tasks")
+            recover_orphans(task_store, lambda task_id, data: report_scheduler.submit(task_id, generate_report, data, task_id))
+        except Exception as e:
+            logging.error(f"Task maintenance failed: {str(e)}", exc_info=True)
+        time.sleep(TASK_MAINTENANCE_INTERVAL)
+
+def publish_event(task_id, event, data):
+    """Record a progress event for report stream clients; failures never break the report."""
+    try:
+        task_store.add_event(task_id, event, data)
+    except Exception as e:
+        logging.warning(f"Failed to publish {event} event for task {task_id}: {str(e)}")
+
+def fail_task(task_id, error, trace=None):
+    """Mark a task as failed and tell stream clients."""
+    publish_event(task_id, 'error', {'error': error})
+    record = {'status': 'error', 'error': error}
+    if trace is not None:
+        record['trace'] = trace.to_dict()
+    task_store.set(task_id, record)
+    REPORTS.inc(status='error')
+
+@contextmanager
+def stage(name):
+    """Time a report pipeline stage for both /metrics and the task trace."""
+    with STAGE_SECONDS.time(stage=name), span(name) as attrs:
+        yield attrs
+
+def queue_full_response(error):
+    """Build a 503 response telling the client when to retry."""
+    response = jsonify({"error": "Server is busy, please retry later", "retry_after": error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
 
 @app.route('/api/calculate-scores', methods=['POST'])
 def calculate_scores():
@@ -54,18 +170,88 @@ def calculate_scores():
         if not isinstance(data['answers'], dict):
             return jsonify({"error": "Invalid answers format"}), 400
 
-        # Calculate trait scores using the assessment manager
-        trait_scores = assessment_manager.calculate_scores(data['answers'])
+        # Calculate trait scores on the fast lane so report jobs never delay scoring
+        job = fast_scheduler.submit(None, assessment_manager.calculate_scores, data['answers'])
+        trait_scores = job.result(timeout=FAST_LANE_TIMEOUT)
         
         return jsonify({
             "message": "Skill scores calculated successfully",
             "trait_scores": trait_scores
         }), 200
 
+    except QueueFullError as e:
+        return queue_full_response(e)
     except Exception as e:
         logging.error(f"Error calculating scores: {str(e)}", exc_info=True)
         return jsonify({"error": "Failed to calculate skill scores"}), 500
 
+def read_batch_records():
+    """Yield answer records from a JSON array body or a streamed NDJSON body."""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        for line in request.stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+        return
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('students')
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of answer records")
+    yield from data
+
+def valid_batch_record(record):
+    """A batch record needs an answers dict whose values are strings or lists of strings."""
+    if not isinstance(record, dict) or not isinstance(record.get('answers'), dict):
+        return False
+    return all(
+        isinstance(answer, str) or (isinstance(answer, list) and all(isinstance(ans, str) for ans in answer))
+        for answer in record['answers'].values()
+    )
+
+def score_batch(records, start=0):
+    """Score records in chunks and yield NDJSON result lines; `start` numbers records without an id."""
+    def flush(chunk):
+        valid = [(i, record) for i, record in chunk if valid_batch_record(record)]
+        scores = iter(assessment_manager.calculate_scores_batch([record['answers'] for _, record in valid]))
+        valid_ids = {i for i, _ in valid}
+        for i, record in chunk:
+            record_id = record.get('id', i) if isinstance(record, dict) else i
+            if i in valid_ids:
+                result = {"id": record_id, "trait_scores": next(scores)}
+            else:
+                result = {"id": record_id, "error": "Invalid answers format"}
+            yield json.dumps(result) + "\n"
+
+    chunk = []
+    for i, record in enumerate(records, start):
+        chunk.append((i, record))
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield from flush(chunk)
+            chunk = []
+    if chunk:
+        yield from flush(chunk)
+
+@app.route('/api/calculate-scores/batch', methods=['POST'])
+def calculate_scores_batch():
+    """Calculate trait scores for a whole cohort, streaming one NDJSON line per student."""
+    try:
+        records = read_batch_records()
+        if request.mimetype not in ('application/x-ndjson', 'application/jsonl'):
+            # Validate the JSON body up front so errors still get a 400
+            records = list(records)
+        return Response(stream_with_context(score_batch(records)), mimetype='application/x-ndjson')
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error calculating batch scores: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to calculate skill scores"}), 500
+
 @app.route('/api/submit-assessment', methods=['POST'])
 def submit_assessment():
     """Initiate assessment submission and generate career report in the background."""
@@ -76,13 +262,29 @@ def submit_assessment():
         if not isinstance(data['answers'], dict):
             return jsonify({"error": "Invalid answers format"}), 400
 
-        # Generate a unique task ID
-        task_id = str(uuid.uuid4())
-        tasks[task_id] = {'status': 'processing'}
+        # Identical submissions (double clicks, client retries) share one task instead of starting new work
+        task_id, created = task_store.create_or_attach(
+            str(uuid.uuid4()), {'status': 'queued', 'queued_at': time.time()}, data, submission_key(data)
+        )
+        if not created:
+            task = task_store.get(task_id) or {}
+            logging.info(f"Duplicate submission attached to task {task_id} ({task.get('status')})")
+            if task.get('status') == 'completed':
+                return jsonify({
+                    "message": "Report already generated",
+                    "task_id": task_id,
+                    "status": "completed",
+                    "report_url": task.get('report_url')
+                }), 200
+            return jsonify({"message": "Report generation already in progress", "task_id": task_id}), 202
 
-        # Start report generation in a background thread
-        thread = threading.Thread(target=generate_report, args=(data, task_id))
-        thread.start()
+        # Queue report generation on the report worker pool
+        try:
+            report_scheduler.submit(task_id, generate_report, data, task_id)
+        except QueueFullError as e:
+            task_store.delete(task_id)
+            logging.warning(f"Report queue full, rejecting submission (retry after {e.retry_after}s)")
+            return queue_full_response(e)
 
         return jsonify({"message": "Report generation started", "task_id": task_id}), 202
 
@@ -92,76 +294,405 @@ def submit_assessment():
 
 def generate_report(data, task_id):
     """Generate the career report and update task status."""
+    queued_at = (task_store.get(task_id) or {}).get('queued_at')
+    with start_trace('generate_report', origin=queued_at) as trace:
+        if queued_at is not None:
+            trace.add('queue_wait', 0, trace.offset())
+        run_report(data, task_id, trace)
+
+def run_report(data, task_id, trace):
+    """Run the report pipeline for one task, recording each stage in its trace."""
+    task_store.set(task_id, {'status': 'processing'})
+    publish_event(task_id, 'status', {'status': 'processing'})
+    started = time.perf_counter()
+    deadline = time.monotonic() + REPORT_DEADLINE_SECONDS if REPORT_DEADLINE_SECONDS > 0 else None
     try:
         # Calculate trait scores
-        trait_scores = assessment_manager.calculate_scores(data['answers'])
+        with stage('calculate_scores'):
+            trait_scores = assessment_manager.calculate_scores(data['answers'])
+        publish_event(task_id, 'trait_scores', {'trait_scores': trait_scores})
         
         # Extract student information
-        student_name = data.get('studentName', 'Student').strip()
-        student_info = {
-            'name': student_name,
-            'age': str(data.get('age', 'Not provided')),
-            'academic_info': str(data.get('academicInfo', 'Not provided')),
-            'interests': str(data.get('interests', 'Not provided')),
-            'achievements': [
-                str(data.get('answers', {}).get('question13', 'None')),
-                str(data.get('answers', {}).get('question30', 'None'))
-            ]
-        }
+        student_info = student_details(data)
         
         # Extract career goal
-        career_goal = extract_career_goal(list(data['answers'].values()))
+        with stage('extract_career_goal'):
+            career_goal, goal_source = extract_career_goal_with_source(list(data['answers'].values()), trait_scores)
         if not career_goal:
-            tasks[task_id] = {'status': 'error', 'error': "Failed to extract career goal"}
+            fail_task(task_id, "Failed to extract career goal", trace)
             return
+
+        # Map goal variants onto one canonical goal so goal-only sections are shared
+        with stage('canonicalize_goal'):
+            career_goal = canonicalize_goal(career_goal)
+        publish_event(task_id, 'career_goal', {'career_goal': career_goal})
         
         # Generate report sections
-        context = f"""
-        Trait Scores: {json.dumps(trait_scores)}
-        Student Info: {json.dumps(student_info)}
-        """
-        report_sections = generate_topic_reports(context.strip(), career_goal, student_info['name'])
-        if not report_sections:
-            tasks[task_id] = {'status': 'error', 'error': "Failed to generate report sections"}
+        context = report_context(trait_scores, student_info)
+        with stage('generate_topic_reports'):
+            report_sections = generate_topic_reports(
+                context, career_goal, student_info['name'],
+                on_section=lambda topic, content: publish_event(task_id, 'section', {'topic': topic, 'content': content}),
+                deadline=deadline
+            )
+
+        if finish_report(task_id, trace, student_info['name'], career_goal, context, report_sections, started):
+            # Goals of completed reports are training examples for the local goal classifier
+            record_example(list(data['answers'].values()), trait_scores, career_goal, goal_source)
+
+    except Exception as e:
+        logging.error(f"Report generation error: {str(e)}", exc_info=True)
+        fail_task(task_id, str(e), trace)
+
+def record_sections(task_id, career_goal, sections, provisional=()):
+    """Store a new version of each given section for later incremental regeneration."""
+    for topic, content in sections.items():
+        try:
+            task_store.add_section(task_id, topic, section_record(career_goal, topic, content, topic in provisional))
+        except Exception as e:
+            logging.warning(f"Failed to store section {topic} of task {task_id}: {str(e)}")
+
+def finish_report(task_id, trace, student_name, career_goal, context, report_sections, started, version=1, reused=()):
+    """Fill missing sections, render and store the PDF, and mark the task completed; return the report id.
+
+    Sections listed in reused were carried over from the previous report version and are not stored again.
+    """
+    # Sections that failed or missed the deadline are filled from earlier reports for the same goal
+    report_sections, provisional = fill_missing_sections(career_goal, report_sections)
+    if all(content == PROVISIONAL_PLACEHOLDER for content in report_sections.values()):
+        # Nothing to show yet; keep generating in the background instead of failing the task
+        report_data = build_report_data(student_name, career_goal, report_sections)
+        if not schedule_update(task_id, context, report_data, provisional, version):
+            fail_task(task_id, "Failed to generate report sections", trace)
+            return None
+        logging.warning(f"Task {task_id} has no sections yet; generating them in the background")
+        publish_event(task_id, 'status', {'status': 'pending', 'provisional_sections': provisional})
+        task_store.set(task_id, {
+            'status': 'pending',
+            'career_goal': career_goal,
+            'provisional_sections': provisional,
+            'trace': trace.to_dict()
+        })
+        return None
+    if provisional:
+        logging.warning(f"Task {task_id} uses provisional sections: {provisional}")
+    record_sections(
+        task_id, career_goal,
+        {topic: content for topic, content in report_sections.items() if topic not in reused}, provisional
+    )
+
+    # Build report data and generate the PDF
+    report_data = build_report_data(student_name, career_goal, report_sections)
+    report_id, render_seconds = render_and_store(report_data, task_id, student_name, version)
+
+    update_pending = bool(provisional) and schedule_update(task_id, context, report_data, provisional, version + 1)
+
+    # Update task status with report URL (stream clients hear first, so a finished task has its final event)
+    report_url = f"/api/download-report/{report_id}"
+    publish_event(task_id, 'completed', {
+        'report_id': report_id, 'report_url': report_url, 'report_version': version,
+        'provisional_sections': provisional, 'update_pending': update_pending
+    })
+    task_store.set(task_id, {
+        'status': 'completed',
+        'report_id': report_id,
+        'report_url': report_url,
+        'report_version': version,
+        'career_goal': career_goal,
+        'provisional_sections': provisional,
+        'update_pending': update_pending,
+        'render_seconds': round(render_seconds, 3),
+        'trace': trace.to_dict()
+    })
+    REPORTS.inc(status='completed')
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage='report_total')
+    return report_id
+
+def schedule_update(task_id, context, report_data, provisional, version):
+    """Queue background generation of provisional sections as report version `version`; False if the queue is full."""
+    try:
+        report_scheduler.submit(
+            f"{task_id}:v{version}", complete_provisional_report, task_id, context, report_data, provisional, version
+        )
+        return True
+    except QueueFullError:
+        logging.warning(f"Report queue full; provisional sections of task {task_id} will not be regenerated")
+        return False
+
+def render_and_store(report_data, task_id, student_name, version=1):
+    """Render a report PDF and move it into the report store; return (report_id, render_seconds)."""
+    pdf_path = report_store.staging_path(task_id if version == 1 else f"{task_id}.v{version}")
+    with stage('render_pdf') as attrs:
+        render_seconds = render_pdf_report(report_data, pdf_path)
+        attrs['render_seconds'] = round(render_seconds, 3)
+    # Rendering may run in a pool process, so its own time is reported back rather than measured there
+    STAGE_SECONDS.observe(render_seconds, stage='generate_pdf_report')
+    PDF_BYTES.inc(os.path.getsize(pdf_path))
+    with stage('store_report'):
+        report_id = report_store.put(pdf_path, student_name, task_id)
+    return report_id, render_seconds
+
+def complete_provisional_report(task_id, context, report_data, provisional, version):
+    """Regenerate provisional sections without a deadline and publish the result as a new report version.
+
+    A pending task, which has no report yet, completes with this version or fails.
+    """
+    first_version = (task_store.get(task_id) or {}).get('status') == 'pending'
+    try:
+        career_goal = report_data['career_goal']
+        student_name = report_data['student_name']
+        regenerated = generate_topic_reports(context, career_goal, student_name, topics=provisional)
+        finished = {topic: content for topic, content in regenerated.items() if not is_failed_section(content)}
+        if not finished:
+            raise RuntimeError("Failed to generate report sections")
+
+        sections = dict(report_data['report'], **finished)
+        remaining = [topic for topic in provisional if topic not in finished]
+        record_sections(task_id, career_goal, finished)
+        report_id, _ = render_and_store(build_report_data(student_name, career_goal, sections), task_id, student_name, version)
+
+        # Stream clients waiting for this version hear about it before the task record changes; sections that
+        # missed the deadline arrive here rather than as section events after completed
+        report_url = f"/api/download-report/{report_id}"
+        publish_event(task_id, 'completed' if first_version else 'report_updated', {
+            'report_id': report_id, 'report_url': report_url, 'report_version': version,
+            'sections': finished, 'provisional_sections': remaining, 'update_pending': False
+        })
+        record = task_store.get(task_id) or {}
+        record.update({
+            'status': 'completed',
+            'report_id': report_id,
+            'report_url': report_url,
+            'report_version': version,
+            'career_goal': career_goal,
+            'provisional_sections': remaining,
+            'update_pending': False
+        })
+        task_store.set(task_id, record)
+        if first_version:
+            REPORTS.inc(status='completed')
+        logging.info(f"Task {task_id} report updated to version {version}; still provisional: {remaining}")
+    except Exception as e:
+        if first_version:
+            logging.error(f"Background generation of task {task_id} failed: {str(e)}", exc_info=True)
+            fail_task(task_id, str(e))
             return
-        
-        # Build report data
-        report_data = build_report_data(student_info['name'], career_goal, report_sections)
+        logging.warning(f"Regenerating provisional sections of task {task_id} failed; keeping version {version - 1}: "
+                        f"{str(e)}")
+        record = task_store.get(task_id)
+        if record is not None:
+            # Stream clients waiting for an update stop once none is pending
+            task_store.set(task_id, dict(record, update_pending=False))
+
+def start_regeneration(task_id, updates):
+    """Queue incremental regeneration of a finished task; return (response body, status code).
+
+    updates may replace submission fields (answers, studentName, ...) before regenerating.
+    """
+    task = task_store.get(task_id)
+    if not task:
+        return {"error": "Task not found"}, 404
+    if task.get('status') not in FINISHED_STATUSES:
+        return {"error": "Report generation is still in progress", "task_id": task_id}, 409
+    data = task_store.payload(task_id)
+    if data is None:
+        return {"error": "Original submission is no longer available"}, 409
+    if 'answers' in updates and not isinstance(updates['answers'], dict):
+        return {"error": "Invalid answers format"}, 400
+
+    data = dict(data, **{field: updates[field] for field in SUBMISSION_FIELDS if field in updates})
+    task_store.set(task_id, dict(task, status='queued', queued_at=time.time()))
+    try:
+        report_scheduler.submit(task_id, regenerate_report_job, data, task_id, task)
+    except QueueFullError as e:
+        task_store.set(task_id, task)
+        logging.warning(f"Report queue full, rejecting regeneration (retry after {e.retry_after}s)")
+        return {"error": "Server is busy, please retry later", "retry_after": e.retry_after}, 503
+    # Stream clients resume after this id; earlier events belong to the previous report version
+    events = task_store.events(task_id)
+    return {
+        "message": "Report regeneration started",
+        "task_id": task_id,
+        "last_event_id": events[-1][0] if events else 0
+    }, 202
+
+def regenerate_report_job(data, task_id, previous):
+    """Regenerate the stale sections of a task and update task status."""
+    queued_at = (task_store.get(task_id) or {}).get('queued_at')
+    with start_trace('regenerate_report', origin=queued_at) as trace:
+        if queued_at is not None:
+            trace.add('queue_wait', 0, trace.offset())
+        run_regeneration(data, task_id, previous, trace)
 
-        # Generate the PDF
-        pdf_filename = f"{student_name.replace(' ', '_')}_Career_Report.pdf"
-        pdf_path = os.path.join(REPORTS_DIR, pdf_filename)
-        generate_pdf_report(report_data, pdf_path)
+def run_regeneration(data, task_id, previous, trace):
+    """Rerun only sections that failed, went stale or depend on changed answers, then rebuild the PDF."""
+    task_store.set(task_id, dict(previous, status='processing'))
+    publish_event(task_id, 'status', {'status': 'processing'})
+    started = time.perf_counter()
+    try:
+        old_data = task_store.payload(task_id) or {}
+        student_changed = any(data.get(field) != old_data.get(field) for field in SUBMISSION_FIELDS)
+
+        with stage('calculate_scores'):
+            trait_scores = assessment_manager.calculate_scores(data['answers'])
+        publish_event(task_id, 'trait_scores', {'trait_scores': trait_scores})
+        student_info = student_details(data)
+
+        # The goal is only extracted again when the answers changed
+        career_goal = previous.get('career_goal')
+        answers_changed = data.get('answers') != old_data.get('answers')
+        if not career_goal or answers_changed:
+            with stage('extract_career_goal'):
+                career_goal, goal_source = extract_career_goal_with_source(
+                    list(data['answers'].values()), trait_scores
+                )
+            if not career_goal:
+                fail_task(task_id, "Failed to extract career goal", trace)
+                return
+            with stage('canonicalize_goal'):
+                career_goal = canonicalize_goal(career_goal)
+        publish_event(task_id, 'career_goal', {'career_goal': career_goal})
+        if student_changed:
+            task_store.set_payload(task_id, data, submission_key(data))
+
+        stored = task_store.sections(task_id)
+        stale = stale_sections(stored, career_goal, student_changed)
+        if not stale and not student_changed and previous.get('status') == 'completed':
+            logging.info(f"Task {task_id} report is up to date; nothing to regenerate")
+            publish_event(task_id, 'completed', {
+                'report_id': previous.get('report_id'), 'report_url': previous.get('report_url'),
+                'report_version': previous.get('report_version', 1),
+                'provisional_sections': previous.get('provisional_sections', []), 'update_pending': False
+            })
+            task_store.set(task_id, previous)
+            return
+        reused = {topic: section['content'] for topic, section in stored.items() if topic not in stale}
+        for topic, content in reused.items():
+            publish_event(task_id, 'section', {'topic': topic, 'content': content})
+        logging.info(f"Regenerating task {task_id} sections {stale}; reusing {list(reused)}")
 
-        # Update task status with report URL
-        tasks[task_id] = {'status': 'completed', 'report_url': f"/api/download-report/{pdf_filename}"}
+        context = report_context(trait_scores, student_info)
+        with stage('generate_topic_reports'):
+            regenerated = generate_topic_reports(
+                context, career_goal, student_info['name'], topics=stale,
+                on_section=lambda topic, content: publish_event(task_id, 'section', {'topic': topic, 'content': content})
+            ) if stale else {}
+
+        report_id = finish_report(
+            task_id, trace, student_info['name'], career_goal, context, dict(reused, **regenerated), started,
+            version=previous.get('report_version', 0) + 1, reused=reused
+        )
+        if report_id and answers_changed:
+            record_example(list(data['answers'].values()), trait_scores, career_goal, goal_source)
 
     except Exception as e:
-        logging.error(f"Report generation error: {str(e)}", exc_info=True)
-        tasks[task_id] = {'status': 'error', 'error': str(e)}
+        logging.error(f"Report regeneration error: {str(e)}", exc_info=True)
+        fail_task(task_id, str(e), trace)
+
+@app.route('/api/regenerate-report/<task_id>', methods=['POST'])
+def regenerate_report(task_id):
+    """Regenerate only the failed, provisional or outdated sections of a report and rebuild its PDF.
+
+    An optional JSON body with new answers regenerates for the updated submission; goal-only
+    sections are reused when the answers still lead to the same career goal.
+    """
+    try:
+        body, status = start_regeneration(task_id, request.get_json(silent=True) or {})
+        response = jsonify(body)
+        if status == 503:
+            response.headers['Retry-After'] = str(body['retry_after'])
+        return response, status
+    except Exception as e:
+        logging.error(f"Error starting report regeneration: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to start report regeneration"}), 500
 
 @app.route('/api/task-status/<task_id>', methods=['GET'])
 def task_status(task_id):
-    """Check the status of a report generation task."""
-    task = tasks.get(task_id)
+    """Check the status of a report generation task; ?trace=1 adds its timeline, ?trace=chrome exports it."""
+    task = task_store.get(task_id)
     if not task:
         return jsonify({"error": "Task not found"}), 404
+    trace = task.pop('trace', None)
+    trace_format = request.args.get('trace', '').lower()
+    if trace_format == 'chrome':
+        if trace is None:
+            return jsonify({"error": "Trace not available until the task finishes"}), 404
+        return jsonify(to_chrome_trace(trace))
+    if trace_format in ('1', 'true', 'yes'):
+        task['trace'] = trace
+    if task.get('status') == 'queued':
+        # Read from the shared store so every worker process reports the same position
+        task['queue_position'] = task_store.queue_position(task_id)
     return jsonify(task)
 
+def stream_events(task_id, after):
+    """Yield Server-Sent Events for a task until its final event has been sent."""
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    last_sent = time.monotonic()
+    while True:
+        # Read the record before the events so a task that finished in between is not missed
+        task = task_store.get(task_id)
+        events = task_store.events(task_id, after)
+        for seq, event, data in events:
+            yield f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+            after = seq
+            if event in TERMINAL_EVENTS and not data.get('update_pending'):
+                return
+        if events:
+            last_sent = time.monotonic()
+        elif task is None or (task.get('status') in FINISHED_STATUSES and not task.get('update_pending')):
+            return
+        elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        time.sleep(STREAM_POLL_INTERVAL)
+
+@app.route('/api/report-stream/<task_id>', methods=['GET'])
+def report_stream(task_id):
+    """Stream report progress (career goal, trait scores, sections, PDF URL) as Server-Sent Events."""
+    if not task_store.get(task_id):
+        return jsonify({"error": "Task not found"}), 404
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId', '0')
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+    return Response(
+        stream_with_context(stream_events(task_id, after)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/download-report/<filename>', methods=['GET'])
 def download_report(filename):
+    """Serve a stored report with ETag, Range and sendfile support."""
     filename = filename.strip()  # Remove unwanted spaces
-    expected_path = os.path.join(REPORTS_DIR, filename)
-
-    # Debugging logs
-    logging.info(f"Received request for: {repr(filename)}")
-    logging.info(f"Checking path: {expected_path}")
+    report = report_store.get(filename)
+    if report:
+        return send_file(
+            report['path'],
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f"{report['student_name'].replace(' ', '_')}_Career_Report.pdf",
+            etag=report['report_id'],
+            conditional=True,
+            max_age=3600
+        )
 
-    if not os.path.exists(expected_path):
-        logging.error(f"File not found at: {expected_path}")
+    # Reports written before content addressing are served by file name
+    try:
+        if not filename.endswith('.pdf'):
+            raise NotFound()
+        return send_from_directory(os.path.abspath(REPORTS_DIR), filename, as_attachment=True, conditional=True)
+    except NotFound:
+        logging.error(f"Report not found: {repr(filename)}")
         return jsonify({"error": "File not found"}), 404
 
-    return send_from_directory(REPORTS_DIR, filename, as_attachment=True)
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose pipeline metrics for this worker process in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+threading.Thread(target=task_maintenance, name='task-maintenance', daemon=True).start()
+if CACHE_WARMUP_HOUR:
+    threading.Thread(target=warmup_loop, args=(task_store,), name='cache-warmup', daemon=True).start()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=3001, debug=False)
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""Splitting batched responses into sections, and caching only the complete ones."""
+import pytest
+from api import gemini_client
+from api.prompt_manager import MIN_SECTION_LENGTH, SECTION_MARKER, generate_topic_batch, split_sections
+
+TOPICS = ['career_intro', 'career_roadmap', 'career_growth']
+
+
+def body(topic):
+    return f"Details about {topic}. " * (MIN_SECTION_LENGTH // 10)
+
+
+def response(topics):
+    return '\n\n'.join(f"{SECTION_MARKER.format(topic=topic)}\n{body(topic)}" for topic in topics)
+
+
+def test_complete_response():
+    sections = split_sections(response(TOPICS), TOPICS)
+    assert list(sections) == TOPICS
+    assert sections['career_roadmap'] == body('career_roadmap').strip()
+
+
+def test_missing_marker():
+    sections = split_sections(response(['career_intro', 'career_growth']), TOPICS)
+    assert set(sections) == {'career_intro', 'career_growth'}
+
+
+def test_reordered_markers():
+    reordered = list(reversed(TOPICS))
+    sections = split_sections(response(reordered), TOPICS)
+    assert set(sections) == set(TOPICS)
+    assert all(sections[topic] == body(topic).strip() for topic in TOPICS)
+
+
+def test_truncated_response():
+    text = response(TOPICS)
+    last_marker = SECTION_MARKER.format(topic='career_growth')
+    sections = split_sections(text[:text.index(last_marker) + len(last_marker) + 20], TOPICS)
+    assert set(sections) == {'career_intro', 'career_roadmap'}  # The short tail section is dropped
+
+
+def test_unknown_and_duplicate_markers():
+    text = response(['career_intro', 'financial_planning', 'career_intro'])
+    assert set(split_sections(text, TOPICS)) == {'career_intro'}
+
+
+class MemoryCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries[key] = value
+
+
+@pytest.mark.parametrize('complete', [True, False])
+def test_batch_cached_only_when_complete(monkeypatch, complete):
+    cache = MemoryCache()
+    calls = []
+
+    def generate(prompt, max_tokens, temperature):
+        calls.append(prompt)
+        return response(TOPICS if complete else TOPICS[:2]), gemini_client.MODEL_NAME
+
+    monkeypatch.setattr(gemini_client, 'get_response_cache', lambda: cache)
+    monkeypatch.setattr(gemini_client, '_generate_uncached', generate)
+
+    first = generate_topic_batch(TOPICS, 'Software Engineer', 'Ann')
+    second = generate_topic_batch(TOPICS, 'Software Engineer', 'Ann')
+    assert first == second
+    assert len(cache.entries) == (1 if complete else 0)
+    assert len(calls) == (1 if complete else 2)
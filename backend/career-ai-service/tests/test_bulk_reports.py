@@ -0,0 +1,91 @@
+"""Interrupted bulk runs keep what they finished, and a rerun only generates the rest."""
+import os
+import sys
+import json
+import time
+import signal
+import subprocess
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECORDS = 10
+WORKERS = 2
+
+
+def bulk_command(input_path, output_dir):
+    return [sys.executable, os.path.join(SERVICE_DIR, 'bulk_reports.py'), input_path,
+            '--output-dir', output_dir, '--workers', str(WORKERS)]
+
+
+def bulk_environment(tmp_path):
+    return dict(
+        os.environ,
+        LLM_PROVIDER='local',
+        LOCAL_PROVIDER_LATENCY='0.2',
+        LLM_CACHE_BACKEND='memory',
+        GOAL_CLASSIFIER_ENABLED='false',
+        CAREER_AI_DATA_DIR=str(tmp_path / 'data'),
+        PDF_RENDER_WORKERS='1',
+    )
+
+
+def checkpoint_lines(output_dir):
+    path = os.path.join(output_dir, 'checkpoint.jsonl')
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def completed_ids(lines):
+    ids = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry['status'] == 'completed':
+            ids.append(entry['id'])
+    return ids
+
+
+def test_interrupted_run_resumes_where_it_stopped(tmp_path):
+    input_path = tmp_path / 'students.ndjson'
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for i in range(RECORDS):
+            f.write(json.dumps({'id': f"s{i}", 'studentName': f"Student {i}",
+                                'answers': {'q1': 'A', 'q2': 'I love coding software'}}) + '\n')
+    output_dir = str(tmp_path / 'out')
+    env = bulk_environment(tmp_path)
+
+    process = subprocess.Popen(bulk_command(str(input_path), output_dir), cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + 120
+    while len(checkpoint_lines(output_dir)) < 2 and time.monotonic() < deadline and process.poll() is None:
+        time.sleep(0.05)
+    process.send_signal(signal.SIGTERM)
+    _, stderr = process.communicate(timeout=120)
+    assert process.returncode == 130, stderr
+
+    # Every PDF written before the interrupt is in the checkpoint, so nothing finished is thrown away
+    interrupted = completed_ids(checkpoint_lines(output_dir))
+    pdfs = [name for name in os.listdir(output_dir) if name.endswith('.pdf')]
+    assert 2 <= len(interrupted) < RECORDS
+    assert len(pdfs) == len(interrupted)
+
+    # Simulate a crash in the middle of writing the next entry
+    with open(os.path.join(output_dir, 'checkpoint.jsonl'), 'a', encoding='utf-8') as f:
+        f.write('{"id": "s9", "status": "compl')
+
+    result = subprocess.run(bulk_command(str(input_path), output_dir), cwd=SERVICE_DIR, env=env,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    assert f"{len(interrupted)} already done, {RECORDS - len(interrupted)} to generate" in result.stderr
+
+    lines = checkpoint_lines(output_dir)
+    ids = completed_ids(lines)
+    assert sorted(ids) == sorted(f"s{i}" for i in range(RECORDS))  # Each record generated exactly once
+    assert sum(1 for line in lines if line.startswith('{"id": "s9", "status": "compl') and not line.endswith('}')) == 1
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert (manifest['completed'], manifest['failed'], manifest['pending']) == (RECORDS, 0, 0)
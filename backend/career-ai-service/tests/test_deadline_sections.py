@@ -0,0 +1,62 @@
+"""Sections that miss the report deadline are left out of the result and never announced afterwards."""
+import time
+import asyncio
+import threading
+from api import prompt_manager
+
+SLOW_TOPIC = prompt_manager.TOPICS[0]
+
+
+def slow_first_topic(finished):
+    def generate(topic, career_goal, student_name):
+        if topic == SLOW_TOPIC:
+            time.sleep(0.3)
+            finished.set()
+        return f"Content for {topic}"
+    return generate
+
+
+def test_late_sections_are_not_announced(monkeypatch):
+    finished = threading.Event()
+    monkeypatch.setattr(prompt_manager, 'generate_topic_report', slow_first_topic(finished))
+    monkeypatch.setattr(prompt_manager, '_remember_section', lambda *args: None)
+    announced = []
+
+    sections = prompt_manager.generate_topic_reports(
+        "context", "Software Engineer", "Asha", concurrent=True, batched=False,
+        on_section=lambda topic, content: announced.append(topic), deadline=time.monotonic() + 0.1
+    )
+    assert SLOW_TOPIC not in sections
+    assert sorted(announced) == sorted(sections)
+
+    assert finished.wait(2)
+    time.sleep(0.05)
+    assert SLOW_TOPIC not in announced
+
+
+def test_late_sections_are_not_announced_async(monkeypatch):
+    finished = threading.Event()
+
+    async def generate(topic, career_goal, student_name):
+        if topic == SLOW_TOPIC:
+            await asyncio.sleep(0.3)
+            finished.set()
+        return f"Content for {topic}"
+
+    monkeypatch.setattr(prompt_manager, 'generate_topic_report_async', generate)
+    monkeypatch.setattr(prompt_manager, '_remember_section', lambda *args: None)
+    monkeypatch.setattr(prompt_manager, '_topic_semaphore', None)
+    announced = []
+
+    async def run():
+        sections = await prompt_manager.generate_topic_reports_async(
+            "context", "Software Engineer", "Asha", batched=False,
+            on_section=lambda topic, content: announced.append(topic), deadline=time.monotonic() + 0.1
+        )
+        await asyncio.sleep(0.4)
+        return sections
+
+    sections = asyncio.run(run())
+    assert finished.is_set()
+    assert SLOW_TOPIC not in sections
+    assert sorted(announced) == sorted(sections)
@@ -0,0 +1,47 @@
+"""Free-text goals map onto a known goal when their trigrams are similar enough, and register as new otherwise."""
+from api.goal_canonicalizer import DEFAULT_GOAL, GoalIndex, normalize_goal, similarity, trigrams
+
+
+def goal_index(tmp_path, threshold=0.8):
+    return GoalIndex(path=str(tmp_path / 'goal_index.sqlite3'), threshold=threshold)
+
+
+def goal_similarity(a, b):
+    return similarity(trigrams(normalize_goal(a)), trigrams(normalize_goal(b)))
+
+
+def test_spelling_variants_share_one_canonical_goal(tmp_path):
+    index = goal_index(tmp_path)
+    assert index.canonicalize("Software Engineer") == "Software Engineer"
+    assert index.canonicalize("**A software engineer.**") == "Software Engineer"
+    assert index.canonicalize("Software Engineers") == "Software Engineer"
+    assert index.canonical_goals() == ["Software Engineer"]
+
+
+def test_dissimilar_goal_is_registered_as_new(tmp_path):
+    index = goal_index(tmp_path)
+    index.canonicalize("Software Engineer")
+    assert goal_similarity("Software Developer", "Software Engineer") < 0.8
+    assert index.canonicalize("Software Developer") == "Software Developer"
+    assert sorted(index.canonical_goals()) == ["Software Developer", "Software Engineer"]
+
+
+def test_threshold_decides_the_match(tmp_path):
+    score = goal_similarity("Data Science", "Data Scientist")
+    strict = goal_index(tmp_path / 'strict', threshold=score + 0.01)
+    strict.canonicalize("Data Scientist")
+    assert strict.canonicalize("Data Science") == "Data Science"
+
+    lenient = goal_index(tmp_path / 'lenient', threshold=score)
+    lenient.canonicalize("Data Scientist")
+    assert lenient.canonicalize("Data Science") == "Data Scientist"
+
+
+def test_goals_registered_by_another_index_are_matched(tmp_path):
+    first, second = goal_index(tmp_path), goal_index(tmp_path)
+    first.canonicalize("Software Engineer")
+    assert second.canonicalize("software engineers") == "Software Engineer"
+
+
+def test_empty_goal_falls_back_to_default(tmp_path):
+    assert goal_index(tmp_path).canonicalize("  ** ") == DEFAULT_GOAL
@@ -0,0 +1,91 @@
+"""The compiled scorer must give the same scores as the original dict-walking implementation."""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from api.assessment_manager import TRAITS, AssessmentManager
+
+THREADS = 16
+ANSWER_SETS = 2000
+
+
+def reference_scores(scoring_system, answers):
+    """Frozen copy of the scoring semantics before the weight matrix was introduced."""
+    trait_scores = {trait: 0.0 for trait in TRAITS}
+    for question_id, answer in answers.items():
+        if question_id not in scoring_system:
+            continue
+        question_data = scoring_system[question_id]
+        selected_answers = [answer] if isinstance(answer, str) else answer
+        for trait in question_data:
+            trait_values = question_data[trait]
+            for ans in selected_answers:
+                if ans in trait_values:
+                    trait_scores[trait] += trait_values[ans]
+
+    max_possible = {trait: 0.0 for trait in trait_scores}
+    for question in scoring_system.values():
+        for trait, options in question.items():
+            if options:
+                max_possible[trait] += max(options.values())
+
+    normalized = {}
+    for trait, score in trait_scores.items():
+        if max_possible[trait] > 0:
+            normalized[trait] = round((score / max_possible[trait]) * 100, 2)
+        else:
+            normalized[trait] = 0.0
+    return normalized
+
+
+def random_answers(rng, scoring_system):
+    """Single picks, multi-selects with repeats, unknown options and unknown questions."""
+    answers = {}
+    for question_id, question in scoring_system.items():
+        if rng.random() < 0.1:
+            continue
+        options = sorted({option for trait_options in question.values() for option in trait_options}) + ['Z']
+        if rng.random() < 0.3:
+            answers[question_id] = [rng.choice(options) for _ in range(rng.randint(0, 3))]
+        else:
+            answers[question_id] = rng.choice(options)
+    if rng.random() < 0.2:
+        answers['unknown_question'] = 'A'
+    return answers
+
+
+@pytest.fixture(scope='module')
+def manager():
+    return AssessmentManager()
+
+
+@pytest.fixture(scope='module')
+def answer_sets(manager):
+    rng = random.Random(1234)
+    return [random_answers(rng, manager.scoring_system) for _ in range(ANSWER_SETS)]
+
+
+def test_concurrent_scores_match_reference(manager, answer_sets):
+    expected = [reference_scores(manager.scoring_system, answers) for answers in answer_sets]
+    start = threading.Barrier(THREADS)
+
+    def score_slice(offset):
+        start.wait()  # Release every thread at once to maximise overlap
+        return [(i, manager.calculate_scores(answer_sets[i])) for i in range(offset, len(answer_sets), THREADS)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = [result for chunk in pool.map(score_slice, range(THREADS)) for result in chunk]
+
+    assert len(results) == len(answer_sets)
+    for i, scores in results:
+        assert scores == expected[i], f"answer set {i} scored differently"
+
+
+def test_batch_scores_match_reference(manager, answer_sets):
+    expected = [reference_scores(manager.scoring_system, answers) for answers in answer_sets]
+    for size in (1, 7, 256, len(answer_sets)):
+        scores = []
+        for i in range(0, len(answer_sets), size):
+            scores.extend(manager.calculate_scores_batch(answer_sets[i:i + size]))
+        assert scores == expected
+
@@ -0,0 +1,95 @@
+"""Duplicate submissions share one task, and a surviving worker claims tasks whose owner process has died."""
+import sys
+import uuid
+import sqlite3
+import socket
+import threading
+import subprocess
+
+import pytest
+
+from api.task_store import OWNER, MemoryTaskStore, SQLiteTaskStore, submission_key
+
+PAYLOAD = {'studentName': "Asha", 'answers': {'q1': 'a'}}
+
+
+def task_store(tmp_path):
+    return SQLiteTaskStore(path=str(tmp_path / 'tasks.sqlite3'))
+
+
+def set_owner(store, task_id, owner):
+    """Hand a task to another worker process, as if that worker had created it."""
+    conn = sqlite3.connect(store.path, isolation_level=None)
+    conn.execute("UPDATE tasks SET owner = ? WHERE task_id = ?", (owner, task_id))
+    conn.close()
+
+
+def owner_of(store, task_id):
+    conn = sqlite3.connect(store.path)
+    owner = conn.execute("SELECT owner FROM tasks WHERE task_id = ?", (task_id,)).fetchone()[0]
+    conn.close()
+    return owner
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'memory'])
+def test_racing_duplicate_submissions_share_one_task(tmp_path, backend):
+    # Separate SQLite stores stand in for separate worker processes, each with its own connections
+    if backend == 'sqlite':
+        stores = [task_store(tmp_path), task_store(tmp_path)]
+    else:
+        stores = [MemoryTaskStore()] * 2
+    submitters = 8
+    barrier = threading.Barrier(submitters)
+    results = []
+
+    def submit(store):
+        barrier.wait()
+        results.append(store.create_or_attach(
+            str(uuid.uuid4()), {'status': 'queued'}, PAYLOAD, submission_key(PAYLOAD)
+        ))
+
+    threads = [threading.Thread(target=submit, args=(stores[i % 2],)) for i in range(submitters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({task_id for task_id, _ in results}) == 1
+    assert sum(1 for _, created in results if created) == 1
+
+
+def test_tasks_of_a_dead_worker_are_claimed(tmp_path):
+    store = task_store(tmp_path)
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    store.create('orphan', {'status': 'processing'}, PAYLOAD)
+    set_owner(store, 'orphan', f"{socket.gethostname()}:{dead.pid}")
+
+    assert store.claim_orphans() == [('orphan', PAYLOAD)]
+    assert owner_of(store, 'orphan') == OWNER
+    assert store.claim_orphans() == []
+
+
+def test_tasks_of_a_live_worker_are_left_alone(tmp_path):
+    store = task_store(tmp_path)
+    live = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        store.create('running', {'status': 'processing'}, PAYLOAD)
+        owner = f"{socket.gethostname()}:{live.pid}"
+        set_owner(store, 'running', owner)
+
+        assert store.claim_orphans() == []
+        assert owner_of(store, 'running') == owner
+    finally:
+        live.kill()
+        live.wait()
+
+
+def test_finished_tasks_are_never_claimed(tmp_path):
+    store = task_store(tmp_path)
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    store.create('done', {'status': 'completed'}, PAYLOAD)
+    set_owner(store, 'done', f"{socket.gethostname()}:{dead.pid}")
+
+    assert store.claim_orphans() == []